@@ -0,0 +1 @@
+ImportAll updates the link integrity information in resumable batches, only for objects with rich text or blocks that may contain links.
@@ -0,0 +1 @@
+ImportAll rebuilds the catalog in batches with commits that continue after the last committed path when interrupted.
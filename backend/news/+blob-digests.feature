@@ -0,0 +1 @@
+Add a blob_digests export option that references files and images by content digest and writes a blob manifest, so each distinct blob is transferred and imported once.
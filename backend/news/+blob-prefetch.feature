@@ -0,0 +1 @@
+Add an optional read-ahead that copies the blobs of the next items to local temp files in worker threads during import.
@@ -0,0 +1 @@
+The content import and the richtext migration commit by the size of the running transaction instead of a fixed number of items.
@@ -0,0 +1 @@
+Deferred import data such as tile and form data is stored in a sqlite-file by UID instead of annotations in the ZODB.
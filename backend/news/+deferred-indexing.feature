@@ -0,0 +1 @@
+ImportAll updates only the indexes the import needs while creating content and indexes the imported objects completely in one batched pass afterwards.
@@ -0,0 +1 @@
+Add a delta mode to the content export and @@export_all that only exports items changed since the last run plus tombstones of deleted and moved items.
@@ -0,0 +1 @@
+Add a streaming JSONL export mode to `CustomExportContent` and let `@@export_all` use it via `STREAM_EXPORT` and `CHUNK_SIZE`.
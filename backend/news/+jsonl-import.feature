@@ -0,0 +1 @@
+Let `CustomImportContent` import streamed JSONL exports (a file or a directory of chunks) one item at a time, and make `@@import_all` prefer them.
@@ -0,0 +1 @@
+Add `scripts/migrate.py` to run the export, import and fix stages with `zconsole run` outside the request cycle.
@@ -0,0 +1 @@
+Log content without parent to an append-only content_without_parent.jsonl instead of rewriting a json-file on every commit.
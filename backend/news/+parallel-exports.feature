@@ -0,0 +1 @@
+Add an option to run the other exports of @@export_all concurrently in a thread pool with one ZODB connection per worker.
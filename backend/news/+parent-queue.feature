@@ -0,0 +1 @@
+Items that arrive before their parent are held back and imported right after it, so unordered exports import in one run.
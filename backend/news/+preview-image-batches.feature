@@ -0,0 +1 @@
+Preview images are created in batches committed by count and size, finding their objects through paths recorded during the import.
@@ -0,0 +1 @@
+Preview image relations are stored in a BTree on the portal and restored in batches by the relation import.
@@ -0,0 +1 @@
+The preview images of imported items are kept in a sqlite-file instead of memory until they are created.
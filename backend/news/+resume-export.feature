@@ -0,0 +1 @@
+Make @@export_all resumable: finished stages are remembered and an interrupted content export continues after the last written item.
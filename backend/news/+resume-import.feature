@@ -0,0 +1 @@
+A streamed content import that was interrupted continues after the last committed item when it is started again.
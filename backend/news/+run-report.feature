@@ -0,0 +1 @@
+Write a run report with wall time, CPU time, items, items/s and RSS per stage of @@export_all and @@import_all.
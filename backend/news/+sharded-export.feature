@@ -0,0 +1 @@
+Add a sharded export mode to `@@export_all` that exports the content in several Zope processes and writes a `manifest.json` for the import.
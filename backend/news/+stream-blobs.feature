@@ -0,0 +1 @@
+Import blobs by handing a hard link or chunked copy of the exported file to the blob storage instead of reading it into memory.
@@ -0,0 +1 @@
+Cache tile view lookups during export and only read the tile annotations referenced by the layout.
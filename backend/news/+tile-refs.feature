@@ -0,0 +1 @@
+Speed up parsing the tile layout of mosaic pages during export.
@@ -0,0 +1 @@
+Collection and listing queries resolve UIDs to paths from a bounded map of the imported objects instead of a lookup per criterion.
@@ -0,0 +1,99 @@
+"""Compare extract_tile_refs with the BeautifulSoup implementation it replaced.
+
+Reads the customContentLayout of every item in one or more exports
+(Plone.json, Plone.jsonl or a directory of jsonl-chunks) and times both
+implementations on them. Without arguments a generated sample layout is used.
+
+    .venv/bin/python scripts/benchmark_tile_refs.py instance/var/instance/Plone.jsonl
+"""
+
+from bs4 import BeautifulSoup
+from collective.eximportimport.examples.exporting.export_content import (
+    extract_tile_refs,
+)
+from collective.eximportimport.examples.importing.jsonl import iter_jsonl
+from pathlib import Path
+
+import argparse
+import ijson
+import re
+import time
+
+
+SAMPLE_TILE = (
+    '<div class="mosaic-grid-row"><div class="mosaic-grid-cell mosaic-width-half">'
+    '<div class="movable removable mosaic-tile"><div class="mosaic-tile-content">'
+    '<div data-tile="./@@plone.app.standardtiles.html/{0}?content=%3Cp%3E{0}%3C%2Fp%3E'
+    '&amp;tile_title=Tile"></div></div></div></div></div>'
+)
+SAMPLE_LAYOUT = (
+    '<!DOCTYPE html><html><body><div data-panel="content">'
+    + "".join(SAMPLE_TILE.format(f"tile{number}") for number in range(40))
+    + "</div></body></html>"
+)
+
+
+def soup_tile_refs(layout):
+    soup = BeautifulSoup(layout, "html.parser")
+    tiles_ref_els = soup.find_all("div", attrs={"data-tile": re.compile(".*")})
+    return [tile_ref_el["data-tile"] for tile_ref_el in tiles_ref_els]
+
+
+def iter_items(path):
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path, "rb") as f:
+            yield from ijson.items(f, "item")
+    else:
+        yield from iter_jsonl(path)
+
+
+def load_layouts(paths):
+    layouts = []
+    for path in paths:
+        for item in iter_items(path):
+            layout = isinstance(item, dict) and item.get("customContentLayout")
+            if layout:
+                layouts.append(layout)
+    return layouts
+
+
+def timed(func, layouts, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(layout) for layout in layouts]
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("exports", nargs="*", help="Export files or directories")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    layouts = load_layouts(args.exports) if args.exports else [SAMPLE_LAYOUT] * 500
+    if not layouts:
+        print("No items with a customContentLayout found.")
+        return
+
+    soup_time, soup_results = timed(soup_tile_refs, layouts, args.repeat)
+    regex_time, regex_results = timed(extract_tile_refs, layouts, args.repeat)
+    mismatches = sum(
+        1 for a, b in zip(soup_results, regex_results, strict=True) if a != b
+    )
+    size = sum(len(layout) for layout in layouts)
+    refs = sum(len(result) for result in regex_results)
+
+    print(f"Layouts:            {len(layouts)} ({size / 1024 / 1024:.1f} MB)")
+    print(f"Tile references:    {refs}")
+    print(f"BeautifulSoup:      {soup_time:.3f}s")
+    print(f"extract_tile_refs:  {regex_time:.3f}s")
+    print(f"Speedup:            {soup_time / regex_time:.1f}x")
+    print(f"Different results:  {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
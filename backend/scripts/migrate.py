@@ -0,0 +1,218 @@
+"""Run the migration stages in a console process instead of a browser request.
+
+Does the same as @@export_all, @@import_all and @@fix_all without tying up a
+WSGI worker (and without proxy or request timeouts):
+
+    zconsole run instance/etc/zope.conf scripts/migrate.py import fix \
+        --import-dir instance/var/import --commit 1000 --cache-size 50000
+
+The stages run in the given order and each is committed when it is done. The
+resumable parts (content export and import, link integrity, indexing) continue
+where an interrupted run stopped. Use --skip with the stage names of the run
+report (e.g. content, custom_import_relations, update_link_integrity) to leave
+parts out. A name applies to every stage, with a prefix (export:, import: or
+fix:) only to that one: --skip export:content keeps an earlier content export
+and still imports it.
+"""
+
+from AccessControl.SecurityManagement import newSecurityManager
+from App.config import getConfiguration
+from collective.eximportimport.examples.exporting import export_all
+from collective.eximportimport.examples.importing import fix_all
+from collective.eximportimport.examples.importing import import_all
+from collective.eximportimport.examples.importing import import_content
+from collective.eximportimport.examples.interfaces import IBrowserLayer
+from collective.exportimport import config
+from plone import api
+from plone.protect.interfaces import IDisableCSRFProtection
+from Testing.makerequest import makerequest
+from zope.component.hooks import setSite
+from zope.globalrequest import setRequest
+from zope.interface import alsoProvides
+
+import argparse
+import logging
+import os
+import sys
+import time
+import transaction
+
+
+logger = logging.getLogger("collective.eximportimport.examples.migrate")
+
+STAGES = ("export", "import", "fix")
+
+
+# flag -> (module, setting) overridden when the flag is given
+SETTINGS = {
+    "chunk_size": (export_all, "CHUNK_SIZE"),
+    "shards": (export_all, "SHARDS"),
+    "parallel_exports": (export_all, "PARALLEL_EXPORTS"),
+    "commit": (import_all, "CONTENT_COMMIT"),
+    "commit_max_seconds": (import_content, "COMMIT_MAX_SECONDS"),
+    "indexing_batch_size": (import_all, "INDEXING_BATCH_SIZE"),
+    "linkintegrity_batch_size": (import_all, "LINKINTEGRITY_BATCH_SIZE"),
+    "reset_dates_batch_size": (fix_all, "RESET_DATES_BATCH_SIZE"),
+}
+
+
+def configure(args):
+    """Override the module settings of the stages with the given flags."""
+    for flag, (module, setting) in SETTINGS.items():
+        value = getattr(args, flag)
+        if value is not None:
+            setattr(module, setting, value)
+    if args.no_deferred_indexing:
+        import_all.DEFERRED_INDEXING = False
+    if args.all_links:
+        import_all.LINKINTEGRITY_ONLY_WITH_LINKS = False
+
+
+def configure_cache(app, args):
+    """Set the ZODB cache size of this process (all its connections)."""
+    db = app._p_jar.db()
+    if args.cache_size is not None:
+        db.setCacheSize(args.cache_size)
+    if args.cache_size_bytes is not None:
+        db.setCacheSizeBytes(args.cache_size_bytes)
+    logger.info(
+        f"ZODB cache: {db.getCacheSize()} objects, {db.getCacheSizeBytes()} bytes"
+    )
+
+
+def setup_site(app, args):
+    """Return the site with a request, a manager and the browser layer set up."""
+    request = app.REQUEST
+    alsoProvides(request, IBrowserLayer, IDisableCSRFProtection)
+    request.form["form.submitted"] = True
+    setRequest(request)
+
+    site = app[args.site]
+    setSite(site)
+    for acl_users in (site.acl_users, app.acl_users):
+        user = acl_users.getUserById(args.user)
+        if user is not None:
+            newSecurityManager(request, user.__of__(acl_users))
+            break
+    else:
+        raise ValueError(f"User {args.user} not found")
+    return site
+
+
+def stage_skip(skip, stage):
+    """The names in skip for stage: without a prefix or prefixed with "<stage>:"."""
+    names = set()
+    for name in skip:
+        prefix, separator, rest = name.partition(":")
+        if not separator:
+            names.add(name)
+        elif prefix == stage:
+            names.add(rest)
+    return names
+
+
+def run_stage(site, name, args):
+    request = site.REQUEST
+    skip = stage_skip(args.skip, name)
+    if name == "export":
+        if args.export_dir:
+            config.CENTRAL_DIRECTORY = args.export_dir
+        view = api.content.get_view("export_all", site, request)
+        view.run(skip=skip)
+    elif name == "import":
+        # the content import reads its server files from the central directory
+        config.CENTRAL_DIRECTORY = args.import_dir
+        view = api.content.get_view("import_all", site, request)
+        view.run(args.import_dir, skip=skip)
+    elif name == "fix":
+        view = api.content.get_view("fix_all", site, request)
+        view.run()
+    transaction.get().note(f"migrate.py: {name}")
+    transaction.commit()
+
+
+def migrate(app, args):
+    configure(args)
+    configure_cache(app, args)
+    site = setup_site(makerequest(app), args)
+    stages = list(dict.fromkeys(args.stages))
+    for name in stages:
+        start = time.perf_counter()
+        logger.info(f"Starting stage {name}")
+        try:
+            run_stage(site, name, args)
+        except Exception:
+            transaction.abort()
+            logger.exception(f"Stage {name} failed, stopping")
+            return 1
+        logger.info(f"Finished stage {name} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+def default_import_dir():
+    return os.path.join(getConfiguration().clienthome, "import")
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description="Export, import and fix a site outside of the request cycle."
+    )
+    parser.add_argument("stages", nargs="+", choices=STAGES)
+    parser.add_argument("--site", default="Plone")
+    parser.add_argument("--user", default="admin")
+    parser.add_argument(
+        "--skip",
+        action="append",
+        default=[],
+        metavar="[STAGE:]NAME",
+        help="stage of the run report to leave out, in all or in one stage "
+        "(repeatable)",
+    )
+
+    paths = parser.add_argument_group("paths")
+    paths.add_argument(
+        "--export-dir", help="write the export here (default: the clienthome)"
+    )
+    paths.add_argument(
+        "--import-dir", help="import from here (default: <clienthome>/import)"
+    )
+
+    cache = parser.add_argument_group("ZODB cache")
+    cache.add_argument("--cache-size", type=int, help="objects per connection")
+    cache.add_argument("--cache-size-bytes", type=int, help="bytes per connection")
+
+    export = parser.add_argument_group("export")
+    export.add_argument("--chunk-size", type=int, help="items per jsonl-file")
+    export.add_argument("--shards", type=int, help="export processes")
+    export.add_argument("--parallel-exports", type=int, help="export threads")
+
+    batches = parser.add_argument_group("import and fix")
+    batches.add_argument("--commit", type=int, help="maximum items per commit")
+    batches.add_argument(
+        "--commit-max-seconds", type=int, help="maximum seconds between commits"
+    )
+    batches.add_argument("--no-deferred-indexing", action="store_true")
+    batches.add_argument("--indexing-batch-size", type=int)
+    batches.add_argument("--linkintegrity-batch-size", type=int)
+    batches.add_argument(
+        "--all-links",
+        action="store_true",
+        help="update the link integrity of all objects, not only those with links",
+    )
+    batches.add_argument("--reset-dates-batch-size", type=int)
+
+    args = parser.parse_args(args)
+    for name in args.skip:
+        prefix, separator, _rest = name.partition(":")
+        if separator and prefix not in STAGES:
+            parser.error(f"--skip {name}: {prefix} is not one of {', '.join(STAGES)}")
+    if args.import_dir is None:
+        args.import_dir = default_import_dir()
+    return args
+
+
+if __name__ == "__main__":
+    # zconsole run <zope.conf> <script> leaves its own arguments in sys.argv
+    # sharded exports start their processes with the same configuration
+    export_all.ZOPE_CONF = sys.argv[2]
+    sys.exit(migrate(globals()["app"], parse_args(sys.argv[4:])))
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import logging
+import os
+
+
+LOG = logging.getLogger("your.package.export.blobs")
+
+BLOB_MANIFEST_SUFFIX = "_blob_manifest.json"
+# New blobs are appended to <name>_blob_manifest.journal while exporting
+# (not .jsonl, that would be read as content from a chunk directory).
+BLOB_JOURNAL_SUFFIX = "_blob_manifest.journal"
+
+
+def file_digest(filepath):
+    """sha256 of a file, read in chunks."""
+    with open(filepath, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class BlobManifest:
+    """Collect the distinct blobs of an export by content digest.
+
+    Items reference their blobs by ``blob_digest`` and the manifest maps each
+    digest to one ``blob_path`` (plus size and content-type), so a file that
+    was uploaded many times is transferred and imported only once.
+    """
+
+    def __init__(self):
+        self.blobs = {}
+        self.references = 0
+        self.duplicate_bytes = 0
+        self._digests = {}
+        self.journal_path = None
+        self._journal = None
+
+    def open_journal(self, manifest_path, resume=False):
+        """Append every new blob to a journal next to manifest_path.
+
+        With resume the blobs of an interrupted export are loaded first, from
+        its manifest (if it was written) and its journal, so the items kept by
+        the resumed export still find their digests. Otherwise the journal of
+        an earlier export is discarded.
+        """
+        root = str(manifest_path)[: -len(BLOB_MANIFEST_SUFFIX)]
+        self.journal_path = f"{root}{BLOB_JOURNAL_SUFFIX}"
+        if resume:
+            self.load(manifest_path)
+            self.load(self.journal_path)
+        # rewritten with everything loaded, an incomplete last line is dropped
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "w") as f:
+            for digest, entry in self.blobs.items():
+                f.write(json.dumps({"digest": digest, **entry}, sort_keys=True))
+                f.write("\n")
+        os.replace(temp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a")  # noqa: SIM115
+        if self.blobs:
+            LOG.info(f"Resuming with {len(self.blobs)} blobs of the last export")
+
+    def load(self, filepath):
+        """Add the blobs of a manifest or a journal."""
+        if not os.path.exists(filepath):
+            return
+        with open(filepath) as f:
+            if filepath.endswith(BLOB_MANIFEST_SUFFIX):
+                blobs = json.load(f)
+            else:
+                blobs = {}
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    blobs[entry.pop("digest")] = entry
+        for digest, entry in blobs.items():
+            self.blobs.setdefault(digest, entry)
+            self._digests.setdefault(entry["blob_path"], digest)
+
+    def add(self, value, filepath):
+        """Register the serialized blob value and return its digest.
+
+        ``value`` is the dict written by the blob-path serializers,
+        ``filepath`` the absolute path of the committed blob file.
+        """
+        blob_path = value["blob_path"]
+        digest = self._digests.get(blob_path)
+        if digest is None:
+            digest = self._digests[blob_path] = file_digest(filepath)
+        self.references += 1
+        if digest in self.blobs:
+            self.duplicate_bytes += value.get("size") or 0
+        else:
+            entry = self.blobs[digest] = {
+                "blob_path": blob_path,
+                "size": value.get("size"),
+                "content-type": value.get("content-type"),
+            }
+            if self._journal is not None:
+                self._journal.write(
+                    json.dumps({"digest": digest, **entry}, sort_keys=True)
+                )
+                self._journal.write("\n")
+                self._journal.flush()
+        return digest
+
+    def write(self, filepath):
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.blobs, f, sort_keys=True, indent=4)
+        os.replace(temp_path, filepath)
+        if self._journal is not None:
+            # kept until the manifest is complete
+            self._journal.close()
+            self._journal = None
+            os.remove(self.journal_path)
+        LOG.info(
+            f"Wrote {len(self.blobs)} distinct blobs for {self.references} "
+            f"references to {filepath} ({self.duplicate_bytes / 1024 / 1024:.1f} "
+            "MB of duplicates skipped)"
+        )
@@ -0,0 +1,82 @@
+from datetime import datetime
+from DateTime import DateTime
+from plone import api
+
+import json
+import logging
+import os
+
+
+LOG = logging.getLogger("your.package.export.delta")
+
+DELTA_STATE_SUFFIX = "_delta_state.json"
+TOMBSTONES_SUFFIX = "_tombstones.json"
+
+
+class DeltaState:
+    """Watermark and UID -> path map of the last export of <basename>.
+
+    A delta export contains the items modified since the watermark plus the
+    new and moved ones (found by comparing the paths with the last run).
+    Items missing since the last run are written as tombstones.
+    """
+
+    def __init__(self, directory, basename):
+        self.filepath = os.path.join(directory, f"{basename}{DELTA_STATE_SUFFIX}")
+        self.watermark = None
+        self.paths = {}
+
+    def load(self):
+        """Read the state of the last run. Returns False if there is none."""
+        if not os.path.exists(self.filepath):
+            return False
+        with open(self.filepath) as f:
+            state = json.load(f)
+        self.watermark = state["watermark"]
+        self.paths = state["paths"]
+        LOG.info(f"Last export at {self.watermark} had {len(self.paths)} items")
+        return True
+
+    def save(self, watermark, paths):
+        state = {
+            "watermark": watermark,
+            "created": datetime.now().isoformat(),
+            "paths": paths,
+        }
+        with open(self.filepath, "w") as f:
+            json.dump(state, f)
+        self.watermark = watermark
+        self.paths = paths
+        LOG.info(f"Saved watermark {watermark} to {self.filepath}")
+
+    def changes(self, query, paths):
+        """Compare with the current paths of the exported items.
+
+        Returns the UIDs to export and the tombstones of deleted and moved items.
+        """
+        catalog = api.portal.get_tool("portal_catalog")
+        modified = {"query": DateTime(self.watermark), "range": "min"}
+        query = dict(query, modified=modified)
+        uids = {brain.UID for brain in catalog.unrestrictedSearchResults(**query)}
+        deleted = []
+        moved = []
+        for uid, path in self.paths.items():
+            if uid not in paths:
+                deleted.append({"UID": uid, "path": path})
+            elif paths[uid] != path:
+                moved.append({"UID": uid, "from": path, "to": paths[uid]})
+                uids.add(uid)
+        uids.update(uid for uid in paths if uid not in self.paths)
+        tombstones = {"since": self.watermark, "deleted": deleted, "moved": moved}
+        return uids, tombstones
+
+
+def catalog_paths(query):
+    """UID -> path of all items matching the export query."""
+    catalog = api.portal.get_tool("portal_catalog")
+    query = {key: value for key, value in query.items() if key != "sort_on"}
+    return {
+        brain.UID: brain.getPath()
+        for brain in catalog.unrestrictedSearchResults(**query)
+        if brain.UID
+    }
@@ -1,19 +1,89 @@
+from ..instrumentation import RunReport
+from .jsonl import get_export_directory
+from AccessControl.SecurityManagement import getSecurityManager
+from AccessControl.SecurityManagement import newSecurityManager
+from AccessControl.SecurityManagement import noSecurityManager
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from heapq import heappop
+from heapq import heappush
 from plone import api
 from plone.protect.interfaces import IDisableCSRFProtection
 from Products.Five import BrowserView
+from Testing.makerequest import makerequest
+from zope.component.hooks import setSite
+from zope.globalrequest import setRequest
 from zope.interface import alsoProvides
+from zope.interface import directlyProvidedBy
 
+import json
 import logging
+import os
+import subprocess
+import sys
+import transaction
 
 
 LOG = logging.getLogger("your.package.export.export_all")
 
+# Write the content as newline-delimited json (Plone.jsonl) instead of one
+# big json-array (Plone.json). Items are written as soon as they are
+# serialized, so memory stays flat and a partial export is still usable.
+STREAM_EXPORT = True
+
+# Split the streamed export into files of CHUNK_SIZE items each
+# (Plone/Plone-00001.jsonl, Plone/Plone-00002.jsonl, ...). 0 means one file.
+CHUNK_SIZE = 0
+
+# Export the content in SHARDS separate Zope processes, each with its own
+# ZODB connection and a share of the top-level folders. The shards are written
+# to Plone/shard-XX.jsonl together with a manifest.json listing them in import
+# order. This needs a storage several processes can open (ZEO or RelStorage).
+# 0 exports everything in the current request.
+SHARDS = 0
+
+# Reference files and images by content digest and write the distinct blobs to
+# <name>_blob_manifest.json next to the export. The import creates every
+# distinct blob only once.
+BLOB_DIGESTS = False
+
+# Only export what changed since the last run: the items modified since the
+# stored watermark plus new and moved ones go to Plone-delta-<stamp>.jsonl,
+# deleted and moved items to Plone-delta-<stamp>_tombstones.json. The other
+# exports are written as export_xxx-delta-<stamp>.json. The first run exports
+# everything. Import the delta with handle_existing_content=2 (update).
+# Not used for sharded exports.
+DELTA_EXPORT = False
+
+# Remember the finished stages in export_all_state.json. If the export dies,
+# the next call of @@export_all skips them and continues the content export
+# after the last item written (not for sharded and delta exports, which start
+# the content over). The file is removed when everything is exported.
+RESUME = True
+STATE_FILENAME = "export_all_state.json"
+
+# Run the other exports in PARALLEL_EXPORTS threads, each with its own ZODB
+# connection (and its own connection cache, so memory grows accordingly).
+# 0 runs them one after another in the current request.
+PARALLEL_EXPORTS = 0
+
+# The zope.conf the shard processes are started with (relative to the
+# directory the instance was started in).
+ZOPE_CONF = os.environ.get("ZOPE_CONF", "instance/etc/zope.conf")
+
 
 class ExportAll(BrowserView):
 
     def __call__(self):
+        self.run()
+        # Important! Redirect to prevent infinite export loop :)
+        return self.request.response.redirect(self.context.absolute_url())
+
+    def run(self, skip=()):
+        """Export everything except the stages in skip (see scripts/migrate.py)."""
         export_content = api.content.get_view(
-            "export_content", self.context, self.request
+            "custom_export_content", self.context, self.request
         )
 
         # call the view to preload some instance variables in order to
@@ -21,15 +91,44 @@ class ExportAll(BrowserView):
         export_content()
 
         self.request.form["form.submitted"] = True
+        portal_types = [ptype.get("value") for ptype in export_content.portal_types()]
 
-        # Pin the export settings
-        export_content(
-            include_blobs=2,  # Export files and images as blob paths
-            download_to_server=True,
-            migration=True,
-            write_errors=True,
-            portal_type=[ptype.get("value") for ptype in export_content.portal_types()],
-        )
+        resume = self.load_state()
+        self.report = RunReport("export")
+        try:
+            self.export_stages(export_content, portal_types, resume, skip)
+        finally:
+            self.report.write(get_export_directory())
+
+    def export_stages(self, export_content, portal_types, resume, skip=()):
+        """Export the content and then the other data, skipping finished stages."""
+        if not self.skipped("content", skip):
+            with self.report.stage("content") as stage:
+                if SHARDS > 1:
+                    stage["items"] = self.export_content_sharded(portal_types, SHARDS)
+                else:
+                    if not resume:
+                        # the import prefers the manifest.json of a sharded
+                        # export over the chunks in the same directory
+                        portal_id = api.portal.get().getId()
+                        remove_shard_files(
+                            os.path.join(get_export_directory(), portal_id)
+                        )
+                    # Pin the export settings
+                    export_content(
+                        include_blobs=2,  # Export files and images as blob paths
+                        download_to_server=True,
+                        migration=True,
+                        write_errors=True,
+                        jsonl=STREAM_EXPORT,
+                        chunk_size=CHUNK_SIZE,
+                        blob_digests=BLOB_DIGESTS,
+                        delta=DELTA_EXPORT,
+                        resume=resume and not DELTA_EXPORT,
+                        portal_type=portal_types,
+                    )
+                    stage["items"] = getattr(export_content, "exported_count", None)
+            self.mark_completed("content")
 
         # remove exports you are 100% sure you don't need for the migration.
         other_exports = [
@@ -47,10 +146,260 @@ class ExportAll(BrowserView):
         # disable CSRF protection
         alsoProvides(self.request, IDisableCSRFProtection)
 
+        pending = []
         for name in other_exports:
-            view = api.content.get_view(name, self.context, self.request)
-            # This saves each export in var/instance/export_xxx.json
-            view(download_to_server=True)
+            if self.skipped(name, skip):
+                continue
+            filename = None
+            if export_content.delta_stamp:
+                # Local roles, ordering, portlets etc. change without updating
+                # the modification date, so they are exported completely.
+                filename = f"{name}-delta-{export_content.delta_stamp}.json"
+            pending.append((name, filename))
 
-        # Important! Redirect to prevent infinite export loop :)
-        return self.request.response.redirect(self.context.absolute_url())
+        if PARALLEL_EXPORTS > 1:
+            self.run_exports_parallel(pending, PARALLEL_EXPORTS)
+        else:
+            for name, filename in pending:
+                view = api.content.get_view(name, self.context, self.request)
+                if filename:
+                    self.request.form["filename"] = filename
+                with self.report.stage(name):
+                    # This saves each export in var/instance/export_xxx.json
+                    view(download_to_server=True)
+                self.mark_completed(name)
+            self.request.form.pop("filename", None)
+        self.clear_state()
+
+    def skipped(self, name, skip):
+        """Whether stage name is left out or was finished by an earlier run."""
+        if name in skip:
+            LOG.info(f"Skipping {name}")
+        elif name in self.state["completed"]:
+            LOG.info(f"Skipping {name}, already exported")
+        else:
+            return False
+        self.report.skip(name)
+        return True
+
+    def run_exports_parallel(self, pending, workers):
+        """Run the exports in a thread pool, each in its own ZODB connection.
+
+        The exports only read, so they see the last committed state of the
+        database. Failed exports are collected and reported at the end.
+        """
+        # Everything the workers need from this request and connection
+        setup = {
+            "db": self.context._p_jar.db(),
+            "user_id": getSecurityManager().getUser().getId(),
+            "layers": directlyProvidedBy(self.request),
+            "context_path": self.context.getPhysicalPath(),
+            "portal_path": api.portal.get().getPhysicalPath(),
+        }
+        errors = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.export_in_connection, setup, *job): job[0]
+                for job in pending
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    LOG.exception(f"Export {name} failed")
+                    errors.append(f"{name}: {e}")
+                else:
+                    self.mark_completed(name)
+        if errors:
+            raise RuntimeError(f"{len(errors)} exports failed: {'; '.join(errors)}")
+
+    def export_in_connection(self, setup, name, filename):
+        """Call the export view name in a new connection (runs in a worker)."""
+        connection = setup["db"].open()
+        try:
+            app = makerequest(connection.root()["Application"])
+            request = app.REQUEST
+            # the layers the views are registered for
+            alsoProvides(request, setup["layers"])
+            alsoProvides(request, IDisableCSRFProtection)
+            request.form["form.submitted"] = True
+            if filename:
+                request.form["filename"] = filename
+            setRequest(request)
+
+            context = app.unrestrictedTraverse(setup["context_path"])
+            portal = app.unrestrictedTraverse(setup["portal_path"])
+            setSite(portal)
+            for acl_users in (portal.acl_users, app.acl_users):
+                user = acl_users.getUserById(setup["user_id"])
+                if user is not None:
+                    newSecurityManager(request, user.__of__(acl_users))
+                    break
+
+            view = api.content.get_view(name, context, request)
+            with self.report.stage(name, thread=True):
+                view(download_to_server=True)
+        finally:
+            transaction.abort()
+            noSecurityManager()
+            setSite(None)
+            setRequest(None)
+            connection.close()
+
+    @property
+    def state_path(self):
+        return os.path.join(get_export_directory(), STATE_FILENAME)
+
+    def load_state(self):
+        """Read the stages finished by an interrupted run.
+
+        Returns True if there was one, i.e. the export is resumed.
+        """
+        self.state = {"started": datetime.now().isoformat(), "completed": []}
+        if not RESUME or not os.path.exists(self.state_path):
+            self.save_state()
+            return False
+        with open(self.state_path) as f:
+            self.state = json.load(f)
+        LOG.info(
+            f"Resuming export started {self.state['started']}, finished stages: "
+            f"{', '.join(self.state['completed']) or 'none'}"
+        )
+        return True
+
+    def save_state(self):
+        if not RESUME:
+            return
+        with open(self.state_path, "w") as f:
+            json.dump(self.state, f, indent=4)
+
+    def mark_completed(self, stage):
+        self.state["completed"].append(stage)
+        self.save_state()
+
+    def clear_state(self):
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def export_content_sharded(self, portal_types, shards):
+        """Export the content in parallel worker processes (see export_shard.py).
+
+        The portal itself is exported by shard-00, the top-level items are
+        distributed over the other shards so that each has about the same
+        number of items. Every subtree is exported by exactly one shard in path
+        order, so the shards can be imported one after the other.
+        """
+        portal = api.portal.get()
+        portal_path = "/".join(portal.getPhysicalPath())
+        directory = os.path.join(get_export_directory(), portal.getId())
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        remove_shard_files(directory)
+
+        jobs = [("shard-00", [portal_path], 0)]
+        for number, paths in enumerate(split_into_shards(portal_path, shards), 1):
+            jobs.append((f"shard-{number:02d}", paths, -1))
+
+        zconsole = os.path.join(os.path.dirname(sys.executable), "zconsole")
+        script = os.path.join(os.path.dirname(__file__), "export_shard.py")
+        # the shards export as the user running this export
+        user_id = api.user.get_current().getId()
+        processes = []
+        for name, paths, depth in jobs:
+            cmd = [zconsole, "run", ZOPE_CONF, script]
+            cmd += ["--site", portal.getId(), "--user", user_id, "--name", name]
+            cmd += ["--output-dir", directory, "--depth", str(depth)]
+            cmd += ["--chunk-size", str(CHUNK_SIZE)]
+            if BLOB_DIGESTS:
+                cmd.append("--blob-digests")
+            for path in paths:
+                cmd += ["--path", path]
+            for portal_type in portal_types:
+                cmd += ["--portal-type", portal_type]
+            LOG.info(f"Starting {name} for {len(paths)} path(s)")
+            processes.append((name, paths, subprocess.Popen(cmd)))  # noqa: S603
+
+        total = write_shard_manifest(directory, portal_path, processes)
+        msg = f"Exported {total} items in {len(jobs)} shards to {directory}"
+        LOG.info(msg)
+        api.portal.show_message(msg, self.request)
+        return total
+
+
+def write_shard_manifest(directory, portal_path, processes):
+    """Wait for the shard processes and write manifest.json listing their files.
+
+    processes is a list of (name, paths, process). Returns the number of
+    exported items. If a shard failed, a RuntimeError is raised after the
+    manifest is written (so the content stage is not marked as completed).
+    """
+    manifest = {
+        "created": datetime.now().isoformat(),
+        "site": portal_path,
+        "shards": [],
+        "files": [],
+    }
+    failed = []
+    for name, paths, process in processes:
+        returncode = process.wait()
+        status_path = os.path.join(directory, f"{name}.status.json")
+        status = {"name": name, "paths": paths, "files": [], "count": 0}
+        if os.path.exists(status_path):
+            with open(status_path) as f:
+                status = json.load(f)
+        status["returncode"] = returncode
+        if returncode:
+            LOG.error(f"Export of {name} failed with exit code {returncode}")
+            failed.append(name)
+        else:
+            LOG.info(f"Exported {status['count']} items in {name}")
+        manifest["shards"].append(status)
+        manifest["files"] += status["files"]
+
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    if failed:
+        raise RuntimeError(f"Export of {', '.join(failed)} failed")
+    return sum(shard["count"] for shard in manifest["shards"])
+
+
+def remove_shard_files(directory):
+    """Remove the files and the manifest.json of an earlier sharded export."""
+    if not os.path.isdir(directory):
+        return
+    names = [
+        name
+        for name in os.listdir(directory)
+        if name == "manifest.json" or name.startswith("shard-")
+    ]
+    for name in names:
+        os.remove(os.path.join(directory, name))
+    if names:
+        LOG.info(f"Removed {len(names)} files of an earlier sharded export")
+
+
+def split_into_shards(portal_path, shards):
+    """Distribute the top-level items over shards by the size of their subtree.
+
+    Returns a list of path lists, each sorted by path.
+    """
+    catalog = api.portal.get_tool("portal_catalog")
+    sizes = []
+    for brain in catalog.unrestrictedSearchResults(
+        path={"query": portal_path, "depth": 1}, sort_on="path"
+    ):
+        path = brain.getPath()
+        sizes.append((len(catalog.unrestrictedSearchResults(path=path)), path))
+
+    # Greedy: the biggest subtree goes into the currently smallest shard
+    heap = [(0, number, []) for number in range(shards)]
+    for size, path in sorted(sizes, reverse=True):
+        total, number, paths = heappop(heap)
+        paths.append(path)
+        heappush(heap, (total + size, number, paths))
+    return [
+        sorted(paths)
+        for total, number, paths in sorted(heap, key=lambda i: i[1])
+        if paths
+    ]
@@ -1,19 +1,57 @@
-from bs4 import BeautifulSoup
+from .blobs import BLOB_MANIFEST_SUFFIX
+from .blobs import BlobManifest
+from .delta import catalog_paths
+from .delta import DeltaState
+from .delta import TOMBSTONES_SUFFIX
+from .jsonl import get_export_directory
+from .jsonl import JsonlWriter
 from collections import OrderedDict
+from datetime import datetime
+from DateTime import DateTime
 from collective.exportimport.export_content import ExportContent
+from collective.exportimport.interfaces import IBase64BlobsMarker
+from collective.exportimport.interfaces import IMigrationMarker
+from collective.exportimport.interfaces import IPathBlobsMarker
+from html import unescape
+from plone import api
 from plone.app.blocks.layoutbehavior import ILayoutBehaviorAdaptable
 from plone.restapi.serializer.converters import json_compatible
+from plone.tiles.data import ANNOTATIONS_KEY_PREFIX
 from string import punctuation
 from zope.annotation.interfaces import IAnnotations
-from zope.component import queryMultiAdapter
+from zope.component import getSiteManager
+from zope.interface import alsoProvides
+from zope.interface import Interface
+from zope.interface import noLongerProvides
+from zope.interface import providedBy
 from urllib.parse import urlparse, parse_qs
+from ZODB.interfaces import BlobError
+from ZODB.POSException import POSError
 
+import json
 import logging
+import os
 import re
 
 
 LOG = logging.getLogger("your.package.export.export_content")
 
+# Comments, CDATA sections, script and style elements with their raw text,
+# <div ...> start tags and other start tags (quoted attribute values may
+# contain "<" and ">"). Only the attributes of divs are captured.
+DIV_TAG_PATTERN = re.compile(
+    r"""<!--.*?-->"""
+    r"""|<!\[CDATA\[.*?\]\]>"""
+    r"""|<(?P<raw>script|style)(?=[\s/>])(?:[^>"']|"[^"]*"|'[^']*')*>"""
+    r""".*?(?=</(?P=raw)[\s/>]|\Z)"""
+    r"""|<div(?=[\s/>])(?P<attributes>(?:[^>"']|"[^"]*"|'[^']*')*)>"""
+    r"""|<[a-z][^\s/>]*(?:[^>"']|"[^"]*"|'[^']*')*>""",
+    re.IGNORECASE | re.DOTALL,
+)
+ATTRIBUTE_PATTERN = re.compile(
+    r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?"""
+)
+
 
 class CustomExportContent(ExportContent):
 
@@ -21,11 +59,343 @@ class CustomExportContent(ExportContent):
         "your.old.tilename",
     )  # Paste here tiles which are not used anymore in the old system.
 
+    blob_manifest = None
+    blob_manifest_path = None
+    export_directory = None
+    delta_state = None
+    delta_stamp = None
+    delta_uids = None
+
+    def __call__(  # noqa: C901
+        self,
+        portal_type=None,
+        path=None,
+        depth=-1,
+        include_blobs=1,
+        download_to_server=False,
+        migration=False,
+        include_revisions=False,
+        write_errors=False,
+        jsonl=False,
+        chunk_size=0,
+        output_directory=None,
+        blob_digests=False,
+        delta=False,
+        resume=False,
+    ):
+        # Reference blobs by content digest and write a manifest of the
+        # distinct blobs (only for blobs exported as path, include_blobs=2).
+        self.blob_manifest = BlobManifest() if blob_digests else None
+        self.blob_manifest_path = None
+        self.delta_state = self.delta_stamp = self.delta_uids = None
+        if not (
+            jsonl and download_to_server and self.request.form.get("form.submitted")
+        ):
+            return super().__call__(
+                portal_type=portal_type,
+                path=path,
+                depth=depth,
+                include_blobs=include_blobs,
+                download_to_server=download_to_server,
+                migration=migration,
+                include_revisions=include_revisions,
+                write_errors=write_errors,
+            )
+
+        # Same setup as ExportContent.__call__
+        self.portal_type = portal_type or []
+        if isinstance(self.portal_type, str):
+            self.portal_type = [self.portal_type]
+        self.migration = migration
+        self.path = path or "/".join(self.context.getPhysicalPath())
+        self.depth = int(depth)
+        self.include_blobs = int(include_blobs)
+        self.include_revisions = include_revisions
+        self.write_errors = write_errors or self.request.form.get("write_errors")
+
+        self.update()
+
+        if not self.portal_type:
+            api.portal.show_message("Select at least one type to export", self.request)
+            return self.template()
+
+        if self.include_blobs == 1:
+            alsoProvides(self.request, IBase64BlobsMarker)
+        elif self.include_blobs == 2:
+            alsoProvides(self.request, IPathBlobsMarker)
+        if self.migration:
+            alsoProvides(self.request, IMigrationMarker)
+
+        self.errors = []
+        basename = self.export_basename()
+        if delta:
+            basename = self.prepare_delta(
+                basename, output_directory or get_export_directory()
+            )
+        self.export_jsonl(
+            basename,
+            chunk_size=int(chunk_size or 0),
+            directory=output_directory,
+            resume=resume,
+        )
+        if self.delta_state is not None:
+            self.save_delta_state()
+
+        if self.include_blobs == 1:
+            noLongerProvides(self.request, IBase64BlobsMarker)
+        elif self.include_blobs == 2:
+            noLongerProvides(self.request, IPathBlobsMarker)
+        self.finish()
+        self.request.response.redirect(self.request["ACTUAL_URL"])
+
+    def export_basename(self):
+        """The name of the export file without extension."""
+        filename = self.request.form.get("filename")
+        if not filename:
+            if len(self.portal_type) == 1:
+                filename = self.portal_type[0]
+            else:
+                filename = self.path.split("/")[-1]
+        return os.path.splitext(filename)[0]
+
+    def prepare_delta(self, basename, directory):
+        """Restrict the export to what changed since the last run of basename.
+
+        Returns the basename for the delta files (<basename>-delta-<stamp>).
+        The first run exports everything and only records the watermark.
+        """
+        self.delta_watermark = DateTime().ISO8601()
+        query = self.build_query()
+        self.delta_paths = catalog_paths(query)
+        self.delta_state = DeltaState(directory, basename)
+        if not self.delta_state.load():
+            LOG.info(f"No previous export of {basename}, exporting all items")
+            return basename
+
+        self.delta_uids, tombstones = self.delta_state.changes(query, self.delta_paths)
+        self.delta_stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        basename = f"{basename}-delta-{self.delta_stamp}"
+        filepath = os.path.join(directory, f"{basename}{TOMBSTONES_SUFFIX}")
+        with open(filepath, "w") as f:
+            json.dump(tombstones, f, indent=4)
+        LOG.info(
+            f"Exporting changes since {self.delta_state.watermark}: "
+            f"{len(self.delta_uids)} changed, {len(tombstones['deleted'])} deleted "
+            f"and {len(tombstones['moved'])} moved items"
+        )
+        return basename
+
+    def save_delta_state(self):
+        """Store the new watermark. Items that failed are retried next time."""
+        failed = {
+            urlparse(error["path"]).path for error in self.errors if error["path"]
+        }
+        paths = {
+            uid: path for uid, path in self.delta_paths.items() if path not in failed
+        }
+        self.delta_state.save(self.delta_watermark, paths)
+
+    def skip_exported(self, last_item):
+        """Skip all items up to last_item (the export is sorted by path)."""
+        catalog = api.portal.get_tool("portal_catalog")
+        uid = last_item.get("UID")
+        brains = catalog.unrestrictedSearchResults(UID=uid) if uid else []
+        # The item may have been deleted in the meantime
+        last_path = brains[0].getPath() if brains else urlparse(last_item["@id"]).path
+        exported = {
+            brain.UID
+            for brain in catalog.unrestrictedSearchResults(**self.build_query())
+            if brain.getPath() <= last_path
+        }
+        # ExportContent.export_content skips these before loading the objects
+        self.DROP_UIDS = frozenset((*self.DROP_UIDS, *exported))
+        LOG.info(f"Skipping {len(exported)} items up to {last_path}")
+
+    def update_query(self, query):
+        if self.delta_uids:
+            query["UID"] = sorted(self.delta_uids)
+        return query
+
+    def export_content(self):
+        if self.delta_uids is not None and not self.delta_uids:
+            LOG.info("Nothing changed since the last export")
+            return
+        yield from super().export_content()
+
+    def export_jsonl(self, basename, chunk_size=0, directory=None, resume=False):
+        """Stream every exported item to a newline-delimited json-file.
+
+        Without a chunk_size the items are written to <basename>.jsonl, with a
+        chunk_size to <basename>/<basename>-00001.jsonl, ...
+        If a directory is passed the files are written there directly.
+        With resume the items of an interrupted export are kept and the export
+        continues after the last one.
+        """
+        directory = self.prepare_export_directory(
+            basename, chunk_size, directory, resume
+        )
+        self.export_directory = directory
+        if self.blob_manifest is not None:
+            self.blob_manifest_path = os.path.join(
+                directory, f"{basename}{BLOB_MANIFEST_SUFFIX}"
+            )
+            self.blob_manifest.open_journal(self.blob_manifest_path, resume=resume)
+
+        self.start()
+        with JsonlWriter(directory, basename, chunk_size=chunk_size) as writer:
+            if resume:
+                last_item = writer.resume()
+                if last_item:
+                    self.skip_exported(last_item)
+            for datum in self.export_content():
+                if not datum:
+                    continue
+                writer.write(datum)
+
+        if self.errors and self.write_errors:
+            filepath = os.path.join(directory, f"{basename}_errors.json")
+            with open(filepath, "w") as f:
+                json.dump({"unexported_paths": self.errors}, f, indent=4)
+
+        msg = (
+            f"Exported {writer.count} items ({', '.join(self.portal_type)}) to "
+            f"{len(writer.files)} file(s) in {directory} with {len(self.errors)} "
+            "errors"
+        )
+        LOG.info(msg)
+        api.portal.show_message(msg, self.request)
+        self.exported_files = writer.files
+        self.exported_count = writer.count
+
+    def prepare_export_directory(self, basename, chunk_size, directory, resume):
+        """Return the directory for the files of basename and create it.
+
+        Unless the export is resumed, the files of an earlier export of
+        basename are removed.
+        """
+        if directory is None:
+            directory = get_export_directory()
+            if not resume:
+                # the import prefers <basename>.jsonl over <basename>/, so
+                # remove the export in the other layout as well
+                JsonlWriter(directory, basename).clear()
+                JsonlWriter(os.path.join(directory, basename), basename).clear()
+            if chunk_size:
+                directory = os.path.join(directory, basename)
+        elif not resume:
+            JsonlWriter(directory, basename).clear()
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        return directory
+
+    def start(self):
+        # Per export: (tile_name, providedBy(obj), providedBy(request)) -> factory
+        self.tile_view_factories = {}
+        self.tile_stats = {
+            "view_hits": 0,
+            "view_misses": 0,
+            "annotation_lookups": 0,
+            "annotation_scans": 0,
+        }
+
+    def finish(self):
+        stats = getattr(self, "tile_stats", None)
+        if stats:
+            lookups = stats["view_hits"] + stats["view_misses"]
+            hit_rate = stats["view_hits"] / lookups * 100 if lookups else 0
+            LOG.info(
+                f"Tile view lookups: {lookups} ({hit_rate:.1f}% cached, "
+                f"{len(self.tile_view_factories)} distinct). Tile annotations: "
+                f"{stats['annotation_lookups']} read by key, "
+                f"{stats['annotation_scans']} objects fully scanned."
+            )
+
+        if self.blob_manifest is not None:
+            filepath = self.blob_manifest_path
+            if filepath is None:
+                directory = self.export_directory or get_export_directory()
+                filename = f"{self.export_basename()}{BLOB_MANIFEST_SUFFIX}"
+                filepath = os.path.join(directory, filename)
+            self.blob_manifest.write(filepath)
+
+    def get_tile_view(self, obj, tile_name):
+        """Cached version of queryMultiAdapter((obj, self.request), name=tile_name).
+
+        The factory lookup is memoized per tile name and provided interfaces,
+        including tiles that have no view.
+        """
+        required = (providedBy(obj), providedBy(self.request))
+        key = (tile_name, *required)
+        try:
+            factory = self.tile_view_factories[key]
+            self.tile_stats["view_hits"] += 1
+        except KeyError:
+            factory = getSiteManager().adapters.lookup(
+                required, Interface, name=tile_name
+            )
+            self.tile_view_factories[key] = factory
+            self.tile_stats["view_misses"] += 1
+        if factory is None:
+            return None
+        return factory(obj, self.request)
+
+    def tile_annotations(self, obj, tile_refs=None):
+        """Return the serialized tile data stored in the annotations of obj.
+
+        If the layout is known only the keys of the tiles it references are read,
+        otherwise all annotations are scanned.
+        """
+        annotations = IAnnotations(obj)
+        if tile_refs is None:
+            self.tile_stats["annotation_scans"] += 1
+            keys = [
+                key for key in annotations if key.startswith(ANNOTATIONS_KEY_PREFIX)
+            ]
+        else:
+            keys = []
+            for tile_ref in tile_refs:
+                if "plone.app.standardtiles.field" in tile_ref:
+                    continue
+                # Same key as plone.app.blocks uses to clean up unused tile data
+                tile_id = tile_ref.split("?")[0].split("/")[-1]
+                key = f"{ANNOTATIONS_KEY_PREFIX}.{tile_id}"
+                if key not in keys:
+                    keys.append(key)
+            self.tile_stats["annotation_lookups"] += len(keys)
+        tiles = {}
+        for key in keys:
+            value = annotations.get(key)
+            if value is None:
+                continue
+            tile = json_compatible(value)
+            tile.pop("_plone.sacles", None)
+            tiles[key] = tile
+        return tiles
+
     def global_dict_hook(self, item, obj):
         """Use this to modify or skip the serialized data.
         Return None if you want to skip this particular object.
         """
         item = self.handle_tiles(item, obj)
+        if self.blob_manifest is not None:
+            item = self.handle_blob_digests(item, obj)
+        return item
+
+    def handle_blob_digests(self, item, obj):
+        """Replace the blob_path of file and image fields by a blob_digest."""
+        for key, value in item.items():
+            if not isinstance(value, dict) or not value.get("blob_path"):
+                continue
+            blob = getattr(getattr(obj, key, None), "_blob", None)
+            if blob is None:
+                continue
+            try:
+                filepath = blob.committed()
+            except (BlobError, POSError) as e:
+                LOG.warning(f"Keeping blob_path of {key} on {obj.absolute_url()}: {e}")
+                continue
+            value["blob_digest"] = self.blob_manifest.add(value, filepath)
+            del value["blob_path"]
         return item
 
     def handle_tiles(self, item, obj):
@@ -34,28 +404,21 @@ class CustomExportContent(ExportContent):
         if not ILayoutBehaviorAdaptable.providedBy(obj):
             return item
 
-        annotations = IAnnotations(obj)
-        tiles = {}
-        for key, value in annotations.items():
-            if not key.startswith("plone.tiles.data"):
-                continue
-            tile = json_compatible(value)
-            tile.pop("_plone.sacles", None)
-            tiles[key] = tile
+        if not hasattr(self, "tile_stats"):
+            self.start()
+        layout = item.get("customContentLayout")
+        tile_refs = extract_tile_refs(layout) if layout else None
+        tiles = self.tile_annotations(obj, tile_refs)
         if tiles:
             item["_tile_annotations"] = tiles
 
-        if not item.get("customContentLayout"):
+        if not layout:
             # we don't have any tiles so we can return the item
             return item
 
-        soup = BeautifulSoup(item["customContentLayout"], "html.parser")
-        tiles_ref_els = soup.find_all("div", attrs={"data-tile": re.compile(".*")})
-
         tile_data = OrderedDict()
         path = "/".join(obj.getPhysicalPath())
-        for tile_ref_el in tiles_ref_els:
-            tile_ref = tile_ref_el["data-tile"]
+        for tile_ref in tile_refs:
             if tile_ref.startswith("./@@plone.app.standardtiles.field"):
                 continue
             if tile_ref.startswith("./@@plone.app.standardtiles.html?content="):
@@ -80,9 +443,8 @@ class CustomExportContent(ExportContent):
                 )
                 continue
 
-            tile_view = queryMultiAdapter((obj, self.request), name=tile_name)
+            tile_view = self.get_tile_view(obj, tile_name)
             if not tile_view:
-
                 if query and tile_name in [
                     "plone.app.standardtiles.rawembed",
                     "plone.app.standardtiles.image",
@@ -107,6 +469,37 @@ class CustomExportContent(ExportContent):
         return item
 
 
+def extract_tile_refs(layout: str):
+    """Return the data-tile attributes of all divs in a layout in document order.
+
+    A single regex pass over the layout instead of building a DOM, replacing
+    BeautifulSoup(layout, "html.parser").find_all("div", attrs={"data-tile":
+    re.compile(".*")}). Like html.parser, divs in comments, CDATA sections,
+    the text of script and style elements and attribute values of other tags
+    are ignored, entities in the values are unescaped and for duplicate
+    attributes the last one wins.
+
+    Known differences are in unterminated markup only: after an unterminated
+    "<!--", "<![CDATA[" or quoted attribute value the divs are still found,
+    while html.parser drops the text up to the next ">" (newer Python
+    versions drop the rest of the layout after "<!--").
+    """
+    if "data-tile" not in layout.lower():
+        return []
+    tile_refs = []
+    for match in DIV_TAG_PATTERN.finditer(layout):
+        attributes = match.group("attributes")
+        if not attributes or "data-tile" not in attributes.lower():
+            continue
+        tile_ref = None
+        for name, double, single, unquoted in ATTRIBUTE_PATTERN.findall(attributes):
+            if name.lower() == "data-tile":
+                tile_ref = unescape(double or single or unquoted)
+        if tile_ref is not None:
+            tile_refs.append(tile_ref)
+    return tile_refs
+
+
 def parse_tile_url(tile_url: str):
     parsed_url = urlparse(tile_url)
     query = parsed_url.query
@@ -0,0 +1,89 @@
+"""Export one shard of a site with @@custom_export_content.
+
+ExportAll starts this script in a separate Zope process per shard:
+
+    zconsole run instance/etc/zope.conf export_shard.py --site Plone \
+        --user admin --name shard-01 --output-dir var/instance/Plone \
+        --path /Plone/about --path /Plone/news --portal-type Document ...
+
+Each process has its own ZODB connection, so the storage has to support
+several processes (ZEO or RelStorage).
+"""
+
+from AccessControl.SecurityManagement import newSecurityManager
+from collective.eximportimport.examples.interfaces import IBrowserLayer
+from plone import api
+from zope.component.hooks import setSite
+from zope.interface import alsoProvides
+
+import argparse
+import json
+import os
+import sys
+import transaction
+
+
+def export_shard(app, args):
+    request = app.REQUEST
+    alsoProvides(request, IBrowserLayer)
+
+    site = app[args.site]
+    setSite(site)
+    login(site, app, args.user)
+
+    request.form["form.submitted"] = True
+    request.form["filename"] = args.name
+    view = api.content.get_view("custom_export_content", site, request)
+    view(
+        portal_type=args.portal_type,
+        path=args.path,
+        depth=args.depth,
+        include_blobs=2,
+        download_to_server=True,
+        migration=True,
+        write_errors=True,
+        jsonl=True,
+        chunk_size=args.chunk_size,
+        output_directory=args.output_dir,
+        blob_digests=args.blob_digests,
+    )
+    transaction.abort()
+
+    status = {
+        "name": args.name,
+        "paths": args.path,
+        "files": [os.path.basename(path) for path in view.exported_files],
+        "count": view.exported_count,
+        "errors": len(view.errors),
+    }
+    with open(os.path.join(args.output_dir, f"{args.name}.status.json"), "w") as f:
+        json.dump(status, f, indent=4)
+
+
+def login(site, app, user_id):
+    """Run as user_id from the acl_users of the site or of the Zope root."""
+    for acl_users in (site.acl_users, app.acl_users):
+        user = acl_users.getUserById(user_id)
+        if user is not None:
+            newSecurityManager(None, user.__of__(acl_users))
+            return
+    raise ValueError(f"User {user_id} not found")
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Export one shard of a site.")
+    parser.add_argument("--site", default="Plone")
+    parser.add_argument("--user", default="admin", help="export as this user")
+    parser.add_argument("--name", required=True)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--path", action="append", required=True)
+    parser.add_argument("--depth", type=int, default=-1)
+    parser.add_argument("--portal-type", action="append", required=True)
+    parser.add_argument("--chunk-size", type=int, default=0)
+    parser.add_argument("--blob-digests", action="store_true")
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    # zconsole run <zope.conf> <script> leaves its own arguments in sys.argv
+    export_shard(globals()["app"], parse_args(sys.argv[4:]))
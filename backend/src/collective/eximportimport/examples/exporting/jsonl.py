@@ -0,0 +1,144 @@
+from App.config import getConfiguration
+from collective.exportimport import config
+
+import json
+import logging
+import os
+
+
+LOG = logging.getLogger("your.package.export.jsonl")
+
+
+def get_export_directory():
+    """Return the directory collective.exportimport writes server-side exports to."""
+    directory = config.CENTRAL_DIRECTORY
+    if directory:
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+            LOG.info(f"Created central export/import directory {directory}")
+        return directory
+    cfg = getConfiguration()
+    return cfg.clienthome
+
+
+class JsonlWriter:
+    """Write items as newline-delimited json.
+
+    Each item is written and flushed as soon as it is passed in, so memory stays
+    flat and an interrupted export is still usable up to the last line.
+    If ``chunk_size`` is set a new file is started after that many items:
+    ``<basename>-00001.jsonl``, ``<basename>-00002.jsonl``, ...
+    """
+
+    def __init__(self, directory, basename, chunk_size=0):
+        self.directory = directory
+        self.basename = basename
+        self.chunk_size = chunk_size
+        self.count = 0
+        self.files = []
+        self._file = None
+        self._items_in_file = 0
+
+    def filename(self, number):
+        if self.chunk_size:
+            return f"{self.basename}-{number:05d}.jsonl"
+        return f"{self.basename}.jsonl"
+
+    def existing_files(self, chunked=None):
+        if chunked is None:
+            chunked = bool(self.chunk_size)
+        if chunked:
+            prefix = f"{self.basename}-"
+            return sorted(
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.startswith(prefix)
+                and name.endswith(".jsonl")
+                and name[len(prefix) : -len(".jsonl")].isdigit()
+            )
+        filepath = os.path.join(self.directory, f"{self.basename}.jsonl")
+        return [filepath] if os.path.exists(filepath) else []
+
+    def clear(self):
+        """Remove the file and the chunks of an earlier export of basename.
+
+        Otherwise the import would read chunks left over from a larger export.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        filepaths = self.existing_files(chunked=False) + self.existing_files(
+            chunked=True
+        )
+        for filepath in filepaths:
+            os.remove(filepath)
+        if filepaths:
+            LOG.info(f"Removed {len(filepaths)} files of an earlier export")
+
+    def resume(self):
+        """Continue writing after the items of an interrupted export.
+
+        An incomplete last line is cut off. Returns the last complete item or
+        None if nothing was written yet.
+        """
+        self.files = self.existing_files()
+        if not self.files:
+            return None
+        last_line = None
+        for filepath in self.files[:-1]:
+            with open(filepath, "rb") as f:
+                for line in f:
+                    if line.strip():
+                        self.count += 1
+                        last_line = line
+        last_item = json.loads(last_line) if last_line else None
+
+        end = 0
+        lines = 0
+        with open(self.files[-1], "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                if line.strip():
+                    try:
+                        last_item = json.loads(line)
+                    except ValueError:
+                        break
+                    lines += 1
+                end = f.tell()
+        with open(self.files[-1], "r+b") as f:
+            f.truncate(end)
+        self._file = open(self.files[-1], "a")  # noqa: SIM115
+        self._items_in_file = lines
+        self.count += lines
+        LOG.info(f"Resuming {self.files[-1]} after {self.count} items")
+        return last_item
+
+    def write(self, item):
+        if self._file is None or (
+            self.chunk_size and self._items_in_file >= self.chunk_size
+        ):
+            self._open_next_file()
+        self._file.write(json.dumps(item, sort_keys=True))
+        self._file.write("\n")
+        self._file.flush()
+        self._items_in_file += 1
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open_next_file(self):
+        self.close()
+        filepath = os.path.join(self.directory, self.filename(len(self.files) + 1))
+        self._file = open(filepath, "w")  # noqa: SIM115
+        self._items_in_file = 0
+        self.files.append(filepath)
+        LOG.info(f"Writing items to {filepath}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,101 @@
+"""Work through all objects of a site in batches that can be resumed."""
+
+from OFS.interfaces import IObjectManager
+
+import json
+import logging
+import os
+import time
+import transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+def walk_content(obj, after=None):
+    """Yield (path, obj) for obj and all objects below it in path order.
+
+    path is the physical path as tuple. Children are visited in the order of
+    their ids, so the paths are increasing. Objects with a path up to and
+    including ``after`` are skipped without loading the folders that are
+    completely before it.
+    """
+    path = obj.getPhysicalPath()
+    if after is None or path > after:
+        yield path, obj
+    elif after[: len(path)] != path:
+        # after is not inside this folder, everything in it came before
+        return
+    if not IObjectManager.providedBy(obj):
+        return
+    for child_id in sorted(obj.objectIds()):
+        child_path = (*path, child_id)
+        # skip children before after that do not contain it
+        before = after is not None and child_path < after
+        if before and after[: len(child_path)] != child_path:
+            continue
+        child = obj._getOb(child_id, None)
+        if child is None:
+            continue
+        yield from walk_content(child, after)
+
+
+class ResumableBatches:
+    """Commit every batch_size objects and remember the last committed path.
+
+    The path is stored in state_path after each commit, so a restarted run
+    can continue after it (see ``after``). finish() removes the state.
+    """
+
+    def __init__(self, name, state_path, connection, batch_size=500, total=None):
+        self.name = name
+        self.state_path = state_path
+        self.connection = connection
+        self.batch_size = batch_size
+        self.total = total
+        self.after = None
+        self.count = 0
+        self.processed = 0
+        self.pending = 0
+        self.start = time.perf_counter()
+        if os.path.exists(state_path):
+            with open(state_path) as f:
+                state = json.load(f)
+            self.after = tuple(state["path"])
+            self.processed = state["processed"]
+            logger.info(f"Resuming {name} after {'/'.join(self.after)}")
+
+    def done(self, path, processed=True):
+        """Count the object at path, commit when the batch is full."""
+        self.count += 1
+        self.pending += 1
+        if processed:
+            self.processed += 1
+        if self.pending >= self.batch_size:
+            self.commit(path)
+
+    def commit(self, path):
+        transaction.get().note(f"{self.name}: {self.processed} objects")
+        transaction.commit()
+        self.pending = 0
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"path": list(path), "processed": self.processed}, f)
+        os.replace(temp_path, self.state_path)
+        self.connection.cacheMinimize()
+        elapsed = time.perf_counter() - self.start
+        of_total = f" of {self.total}" if self.total else ""
+        logger.info(
+            f"{self.name}: {self.count}{of_total} objects, {self.processed} "
+            f"processed ({self.count / elapsed:.1f} items/s)"
+        )
+
+    def finish(self):
+        transaction.commit()
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        logger.info(
+            f"Finished {self.name}: {self.processed} objects processed in "
+            f"{time.perf_counter() - self.start:.1f}s"
+        )
+        return self.processed
@@ -0,0 +1,115 @@
+import time
+
+
+class CommitPolicy:
+    """Decide when to commit by the size of the running transaction.
+
+    Call add() for every handled item (with the bytes of the blobs it stored)
+    and commit when due() returns a reason, then call committed().
+
+    A commit is due when one of the budgets is reached: items, changed
+    objects, their pickle size, blob bytes or seconds since the last commit.
+    None disables a budget.
+
+    New objects are only known to the connection once a savepoint (or the
+    commit) stores them, so a savepoint is taken every savepoint_items items.
+    Objects in the savepoint storage are measured by their stored pickles,
+    objects changed since by their estimated size.
+    """
+
+    def __init__(
+        self,
+        connection=None,
+        max_items=1000,
+        max_objects=20000,
+        max_bytes=64 * 1024 * 1024,
+        max_blob_bytes=512 * 1024 * 1024,
+        max_seconds=120,
+        savepoint_items=100,
+        clock=time.monotonic,
+    ):
+        self.connection = connection
+        self.max_items = max_items
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+        self.max_blob_bytes = max_blob_bytes
+        self.max_seconds = max_seconds
+        self.savepoint_items = savepoint_items
+        self.clock = clock
+        self.commits = 0
+        self.reasons = {}
+        self.committed()
+
+    def add(self, items=1, blob_bytes=0):
+        self.items += items
+        self.blob_bytes += blob_bytes
+        if self.savepoint_items and (
+            self.items - self._saved_items >= self.savepoint_items
+        ):
+            self.savepoint()
+
+    def savepoint(self):
+        manager = getattr(self.connection, "transaction_manager", None)
+        if manager is None:
+            return
+        manager.savepoint(optimistic=True)
+        self._saved_items = self.items
+
+    def changed_objects(self):
+        """Number and pickle bytes of the objects changed so far."""
+        saved = getattr(self.connection, "_savepoint_storage", None)
+        saved_objects = len(saved.index) if saved is not None else 0
+        saved_bytes = saved.position if saved is not None else 0
+        registered = getattr(self.connection, "_registered_objects", None) or []
+        if saved_bytes != self._saved_bytes or len(registered) < self._counted:
+            # a savepoint stored the objects counted so far
+            self._saved_bytes = saved_bytes
+            self._counted = 0
+            self._registered_objects = 0
+            self._registered_bytes = 0
+        for obj in registered[self._counted :]:
+            self._registered_objects += 1
+            self._registered_bytes += getattr(obj, "_p_estimated_size", 0)
+        self._counted = len(registered)
+        self.objects = saved_objects + self._registered_objects
+        self.pickled_bytes = saved_bytes + self._registered_bytes
+        return self.objects, self.pickled_bytes
+
+    def due(self):
+        """The reason to commit now or None."""
+        objects, pickled_bytes = self.changed_objects()
+        budgets = (
+            ("items", self.items, self.max_items),
+            ("objects", objects, self.max_objects),
+            ("bytes", pickled_bytes, self.max_bytes),
+            ("blob_bytes", self.blob_bytes, self.max_blob_bytes),
+            ("seconds", self.clock() - self.started, self.max_seconds),
+        )
+        for name, value, limit in budgets:
+            if limit is not None and self.items and value >= limit:
+                return name
+        return None
+
+    def committed(self, reason=None):
+        """Start measuring the next transaction."""
+        if reason:
+            self.commits += 1
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self.items = 0
+        self.objects = 0
+        self.pickled_bytes = 0
+        self.blob_bytes = 0
+        self._saved_items = 0
+        self._saved_bytes = 0
+        self._counted = 0
+        self._registered_objects = 0
+        self._registered_bytes = 0
+        self.started = self.clock()
+
+    def describe(self):
+        return (
+            f"{self.items} items, {self.objects} changed objects, "
+            f"~{self.pickled_bytes // 1024} KB, "
+            f"{self.blob_bytes // 1024 // 1024} MB blobs, "
+            f"{self.clock() - self.started:.0f}s"
+        )
@@ -0,0 +1,101 @@
+from heapq import merge
+from urllib.parse import urlparse
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+
+def item_depth(item):
+    return urlparse(item["@id"]).path.rstrip("/").count("/")
+
+
+class ParentQueue:
+    """Items waiting for their parent, keyed by the UID of the parent.
+
+    Up to max_in_memory items are kept in memory, more are spilled to a
+    sqlite-file in directory that is removed by close().
+    """
+
+    def __init__(self, directory, max_in_memory=10000):
+        self.directory = directory
+        self.max_in_memory = max_in_memory
+        self.waiting = {}
+        self.in_memory = 0
+        self.spilled = 0
+        self._db = None
+        self._db_path = None
+
+    def __len__(self):
+        return self.in_memory + self.spilled
+
+    def defer(self, parent_uid, item):
+        if self.in_memory < self.max_in_memory:
+            self.waiting.setdefault(parent_uid, []).append(item)
+            self.in_memory += 1
+            return
+        if self._db is None:
+            self._open_db()
+        self._db.execute(
+            "INSERT INTO deferred (parent_uid, depth, item) VALUES (?, ?, ?)",
+            (parent_uid, item_depth(item), json.dumps(item)),
+        )
+        self.spilled += 1
+
+    def release(self, uid):
+        """Return the items waiting for uid and remove them from the queue."""
+        items = self.waiting.pop(uid, [])
+        self.in_memory -= len(items)
+        if self.spilled:
+            rows = self._db.execute(
+                "SELECT item FROM deferred WHERE parent_uid = ? ORDER BY rowid", (uid,)
+            ).fetchall()
+            if rows:
+                self._db.execute("DELETE FROM deferred WHERE parent_uid = ?", (uid,))
+                self.spilled -= len(rows)
+                items += [json.loads(row[0]) for row in rows]
+        return items
+
+    def remaining(self):
+        """Yield all items that are still waiting, parents before children."""
+        in_memory = sorted(
+            (item for items in self.waiting.values() for item in items),
+            key=item_depth,
+        )
+        self.waiting = {}
+        self.in_memory = 0
+        spilled = []
+        if self.spilled:
+            spilled = (
+                json.loads(row[0])
+                for row in self._db.execute(
+                    "SELECT item FROM deferred ORDER BY depth, rowid"
+                )
+            )
+        yield from merge(in_memory, spilled, key=item_depth)
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            os.remove(self._db_path)
+
+    def _open_db(self):
+        fd, self._db_path = tempfile.mkstemp(
+            dir=self.directory, prefix="deferred-items-", suffix=".sqlite"
+        )
+        os.close(fd)
+        # scratch data that is removed after the run, no need for durability
+        self._db = sqlite3.connect(self._db_path, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute(
+            "CREATE TABLE deferred (parent_uid TEXT, depth INTEGER, item TEXT)"
+        )
+        self._db.execute("CREATE INDEX deferred_parent ON deferred (parent_uid)")
+        logger.info(f"Spilling items waiting for their parent to {self._db_path}")
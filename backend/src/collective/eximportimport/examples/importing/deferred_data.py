@@ -0,0 +1,118 @@
+from zope.annotation.interfaces import IAnnotations
+
+import json
+import sqlite3
+
+
+class AnnotationDeferredDataStore:
+    """Deferred import data in an annotation of the object (stored in the ZODB)."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def set(self, uid, data, obj=None):
+        IAnnotations(obj)[self.key] = dict(data)
+
+    def get(self, uid, obj=None):
+        if obj is None:
+            return {}
+        return IAnnotations(obj).get(self.key, {})
+
+    def delete(self, uid, obj=None):
+        annotations = IAnnotations(obj)
+        if self.key in annotations:
+            del annotations[self.key]
+
+    def get_many(self, uids):
+        # only available with the object
+        return {}
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SqliteDeferredDataStore:
+    """Deferred import data in a sqlite-file keyed by the UID of the object.
+
+    The data is only read once after the import (e.g. by the richtext
+    migration), so it does not need to be in the ZODB. get_many reads the data
+    of many objects at once without loading them.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.filepath)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS deferred_data "
+                "(uid TEXT PRIMARY KEY, data TEXT)"
+            )
+        return self._db
+
+    def set(self, uid, data, obj=None):
+        self.db.execute(
+            "INSERT OR REPLACE INTO deferred_data (uid, data) VALUES (?, ?)",
+            (uid, json.dumps(data)),
+        )
+
+    def delete(self, uid, obj=None):
+        """Remove the data of an earlier import of uid."""
+        self.db.execute("DELETE FROM deferred_data WHERE uid = ?", (uid,))
+
+    def get(self, uid, obj=None):
+        row = self.db.execute(
+            "SELECT data FROM deferred_data WHERE uid = ?", (uid,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def get_many(self, uids):
+        """Return uid -> data for the uids (an empty dict for uids without data)."""
+        uids = list(uids)
+        result = dict.fromkeys(uids)
+        for start in range(0, len(uids), 500):
+            chunk = uids[start : start + 500]
+            # only the placeholders are formatted into the query
+            placeholders = ", ".join("?" * len(chunk))
+            rows = self.db.execute(
+                f"SELECT uid, data FROM deferred_data WHERE uid IN ({placeholders})",  # noqa: S608
+                chunk,
+            )
+            for uid, data in rows:
+                result[uid] = json.loads(data)
+        return {uid: data or {} for uid, data in result.items()}
+
+    def commit(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+
+def iter_with_deferred_data(store, brains, batch_size=500):
+    """Yield (brain, deferred data or None) reading the data in batches."""
+    batch = []
+    for brain in brains:
+        batch.append(brain)
+        if len(batch) >= batch_size:
+            yield from _with_deferred_data(store, batch)
+            batch = []
+    yield from _with_deferred_data(store, batch)
+
+
+def _with_deferred_data(store, brains):
+    if not brains:
+        return
+    data = store.get_many(brain.UID for brain in brains)
+    for brain in brains:
+        yield brain, data.get(brain.UID)
@@ -16,6 +16,9 @@ logger = getLogger(__name__)
 
 MIGRATE_RICHTEXT_CTS = ["Document", "News Item", "Event"]
 
+# Commit after resetting the dates of this many objects
+RESET_DATES_BATCH_SIZE = 500
+
 
 class FixAll(BrowserView):
 
@@ -24,6 +27,12 @@ class FixAll(BrowserView):
         if not request.form.get("form.submitted", False):
             return self.index()
 
+        portal = self.run()
+        return request.response.redirect(portal.absolute_url())
+
+    def run(self):
+        """Migrate to Volto, reset the dates and reenable what the import disabled."""
+        request = self.request
         portal = api.portal.get()
 
         # Volto migration
@@ -75,7 +84,7 @@ class FixAll(BrowserView):
                 logger.info(f"Object at path {brain.getPath()} not found, skipping...")
                 continue
             reset_dates(obj, brain.getPath())
-            if not index % 500:
+            if not index % RESET_DATES_BATCH_SIZE:
                 logger.info(f"Reset dates for {index} objects.")
                 transaction.commit()
 
@@ -112,5 +121,4 @@ class FixAll(BrowserView):
         settings.enabled = True
         logger.info("Finished enabling cachepurging...")
         logger.info("Finished fixing all content!")
-
-        return request.response.redirect(portal.absolute_url())
+        return portal
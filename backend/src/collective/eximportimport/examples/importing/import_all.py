@@ -1,3 +1,8 @@
+from ..instrumentation import RunReport
+from .import_content import deferred_indexing_path
+from .indexing import index_recorded_paths
+from .indexing import rebuild_catalog
+from .linkintegrity import update_link_integrity
 from App.config import getConfiguration
 from logging import getLogger
 from pathlib import Path
@@ -17,6 +22,30 @@ DEFAULT_ADDONS = []
 
 MIGRATE_RICHTEXT_CTS = ["Document", "News Item", "Event"]
 
+# Content exports in the import directory in order of preference.
+# Streamed exports (Plone.jsonl or a directory with jsonl-chunks) are read
+# one item at a time.
+CONTENT_SOURCES = ["Plone.jsonl", "Plone", "Plone.json"]
+
+# Maximum number of items per commit of the content import, the commit policy
+# of the import may commit earlier.
+CONTENT_COMMIT = 2000
+
+# Update only the indexes the import needs while creating content and index
+# the imported objects completely in one pass afterwards (instead of indexing
+# twice and rebuilding the whole catalog).
+DEFERRED_INDEXING = True
+INDEXING_BATCH_SIZE = 500
+INDEXING_STATE_FILENAME = "index_imported_content_state.json"
+# Without deferred indexing the catalog is rebuilt in batches (resumable)
+REBUILD_STATE_FILENAME = "rebuild_catalog_state.json"
+
+# Update the link integrity information in resumable batches, only for objects
+# with rich text or blocks that may contain links.
+LINKINTEGRITY_BATCH_SIZE = 500
+LINKINTEGRITY_ONLY_WITH_LINKS = True
+LINKINTEGRITY_STATE_FILENAME = "update_link_integrity_state.json"
+
 # Before starting any import/upgrade make sure you have set these
 # to environment variable before starting the backend and you have
 # started the blocks conversion tool on localhost:5001
@@ -32,6 +61,14 @@ class ImportAll(BrowserView):
         if not request.form.get("form.submitted", False):
             return self.index()
 
+        cfg = getConfiguration()
+        self.run(Path(cfg.clienthome) / "import")
+
+    def run(self, directory, skip=()):
+        """Prepare the site and import everything from directory.
+
+        Stages named in skip are left out (see scripts/migrate.py).
+        """
         portal = api.portal.get()
 
         # Fake the target being a classic site even though plone.volto is installed...
@@ -50,14 +87,34 @@ class ImportAll(BrowserView):
         settings.enabled = False
 
         transaction.commit()
-        cfg = getConfiguration()
-        directory = Path(cfg.clienthome) / "import"
 
-        view = api.content.get_view("custom_import_content", portal, request)
-        request.form["form.submitted"] = True
-        request.form["commit"] = 500
-        view(server_file="Plone.json", return_json=True)
-        transaction.commit()
+        self.report = RunReport("import")
+        try:
+            self.import_stages(portal, Path(directory), skip)
+        finally:
+            self.report.write(directory)
+
+        logger.info("Finished importing all content!")
+
+    def import_stages(self, portal, directory, skip=()):
+        """Import the content, the other data and update the indexes."""
+        request = self.request
+        if "content" in skip:
+            self.report.skip("content")
+        else:
+            with self.report.stage("content") as stage:
+                view = api.content.get_view("custom_import_content", portal, request)
+                request.form["form.submitted"] = True
+                request.form["commit"] = CONTENT_COMMIT
+                request.form["deferred_indexing"] = DEFERRED_INDEXING
+                server_files = view.server_files
+                server_file = next(
+                    (name for name in CONTENT_SOURCES if name in server_files),
+                    "Plone.json",
+                )
+                view(server_file=server_file, return_json=True)
+                transaction.commit()
+                stage["items"] = getattr(view, "imported_count", None)
 
         other_imports = [
             ("custom_import_relations", "export_relations.json"),
@@ -70,28 +127,54 @@ class ImportAll(BrowserView):
         for view_name, filename in other_imports:
             view = api.content.get_view(view_name, portal, request)
             path = Path(directory) / filename
-            if path.exists():
-                results = view(jsonfile=path.read_text(), return_json=True)
-                logger.info(results)
-                transaction.commit()
+            if view_name in skip:
+                self.report.skip(view_name)
+            elif path.exists():
+                with self.report.stage(view_name):
+                    results = view(jsonfile=path.read_text(), return_json=True)
+                    logger.info(results)
+                    transaction.commit()
             else:
                 logger.info(f"Missing file: {path}")
-
-        logger.info("Start updating linkintegrity information...")
-        view = api.content.get_view("updateLinkIntegrityInformation", portal, request)
-        results = view.update()
-        msg = f"Updated linkintegrity for {results} items"
-        logger.info(msg)
-        transaction.get().note(msg)
-        transaction.commit()
-
-        # Rebuilding the catalog is necessary to prevent issues later on
-        catalog = api.portal.get_tool("portal_catalog")
-        logger.info("Rebuilding catalog...")
-        catalog.clearFindAndRebuild()
-        msg = "Finished rebuilding catalog!"
-        logger.info(msg)
-        transaction.get().note(msg)
-        transaction.commit()
-
-        logger.info("Finished importing all content!")
+                self.report.skip(view_name)
+
+        if "update_link_integrity" in skip:
+            self.report.skip("update_link_integrity")
+        else:
+            with self.report.stage("update_link_integrity") as stage:
+                logger.info("Start updating linkintegrity information...")
+                results = update_link_integrity(
+                    portal,
+                    str(directory / LINKINTEGRITY_STATE_FILENAME),
+                    LINKINTEGRITY_BATCH_SIZE,
+                    only_with_links=LINKINTEGRITY_ONLY_WITH_LINKS,
+                )
+                logger.info(f"Updated linkintegrity for {results} items")
+                stage["items"] = results
+
+        if DEFERRED_INDEXING:
+            self.report.skip("rebuild_catalog")
+            if "index_imported_content" in skip:
+                self.report.skip("index_imported_content")
+                return
+            with self.report.stage("index_imported_content") as stage:
+                stage["items"] = index_recorded_paths(
+                    portal,
+                    deferred_indexing_path(),
+                    str(directory / INDEXING_STATE_FILENAME),
+                    INDEXING_BATCH_SIZE,
+                )
+            return
+
+        if "rebuild_catalog" in skip:
+            self.report.skip("rebuild_catalog")
+            return
+
+        # Rebuilding the catalog is necessary to prevent issues later on.
+        # Unlike clearFindAndRebuild it commits in batches and can be resumed.
+        with self.report.stage("rebuild_catalog") as stage:
+            logger.info("Rebuilding catalog...")
+            stage["items"] = rebuild_catalog(
+                portal, str(directory / REBUILD_STATE_FILENAME), INDEXING_BATCH_SIZE
+            )
+            logger.info("Finished rebuilding catalog!")
@@ -1,4 +1,25 @@
+from ..exporting.blobs import BLOB_MANIFEST_SUFFIX
+from ..exporting.delta import TOMBSTONES_SUFFIX
+from .commit_policy import CommitPolicy
+from .deferred import ParentQueue
+from .deferred_data import AnnotationDeferredDataStore
+from .deferred_data import SqliteDeferredDataStore
+from .import_relations import preview_image_relations
+from .indexing import install_recording_processor
+from .indexing import uninstall_recording_processor
+from .jsonl import iter_jsonl_positions
+from .jsonl import jsonl_files
+from .orphans import OrphanLog
+from .prefetch import BlobPrefetcher
+from .preview_images import PreviewImageBatches
+from .preview_images import PreviewImageStore
+from .progress import ImportProgress
+from .uid_paths import UIDPathResolver
+from Acquisition import aq_base
+from Acquisition import aq_inner
+from Acquisition import aq_parent
 from App.config import getConfiguration
+from collections import deque
 from collective.exportimport.import_content import get_absolute_blob_path
 from collective.exportimport.import_content import ImportContent
 from plone import api
@@ -6,15 +27,20 @@ from plone.i18n.normalizer.interfaces import IURLNormalizer
 from plone.namedfile.file import NamedBlobFile
 from plone.namedfile.file import NamedBlobImage
 from plone.uuid.interfaces import IUUIDGenerator
+from Products.CMFCore.indexing import processQueue
 from Products.CMFPlone.utils import _createObjectByType
 from urllib.parse import urlparse
 from zope.annotation.interfaces import IAnnotations
 from zope.component import getUtility
 
+import copy
 import logging
 import os
 import re
+import shutil
 import simplejson as json
+import tempfile
+import time
 import transaction
 
 
@@ -68,7 +94,58 @@ CUSTOMVIEWFIELDS_MAPPING = {
     "warnings": None,
 }
 
+# Hand blob files over to the blob storage as hard link or chunked copy
+# instead of reading them into memory.
+STREAM_BLOBS = True
+
+# Copy the blobs of the next PREFETCH_WINDOW items to local temp files in
+# PREFETCH_WORKERS threads while the current item is imported (useful when
+# the exported blobs are on slow network storage). 0 disables it.
+PREFETCH_WORKERS = 0
+PREFETCH_WINDOW = 50
+
+# Hold back items whose parent is not imported yet and import them right after
+# their parent. Items that still have no parent at the end are imported with
+# placeholder containers. More than MAX_DEFERRED_IN_MEMORY waiting items are
+# spilled to disk.
+DEFER_MISSING_PARENTS = True
+MAX_DEFERRED_IN_MEMORY = 10000
+
+# Keep track of the committed items of streamed imports, so a restarted
+# import continues where the last one stopped.
+RESUME_IMPORT = True
+STREAM_POSITION_KEY = "exportimport.stream_position"
+
+# With the request parameter deferred_indexing only the indexes needed during
+# the import are updated, the paths of the objects are recorded in this file in
+# the clienthome to be indexed completely afterwards (see ImportAll).
+DEFERRED_INDEXING_FILENAME = "deferred_indexing_paths.txt"
+
+# Commit when the running transaction reaches one of these budgets. The
+# request parameter "commit" is the maximum number of items per commit.
+COMMIT_MAX_OBJECTS = 20000
+COMMIT_MAX_BYTES = 64 * 1024 * 1024
+COMMIT_MAX_BLOB_BYTES = 512 * 1024 * 1024
+COMMIT_MAX_SECONDS = 120
+# Savepoint every so many items, new objects only count once they are stored
+COMMIT_SAVEPOINT_ITEMS = 100
+
+# Commit the preview images in finish() every PREVIEW_IMAGE_COMMIT images or
+# PREVIEW_IMAGE_COMMIT_BYTES of image data (if the import commits), with a
+# savepoint every PREVIEW_IMAGE_SAVEPOINT images in between.
+PREVIEW_IMAGE_COMMIT = 500
+PREVIEW_IMAGE_COMMIT_BYTES = 200 * 1024 * 1024
+PREVIEW_IMAGE_SAVEPOINT = 100
+PREVIEW_IMAGE_LOG_EVERY = 1000
+# sqlite-file in the clienthome that holds the preview images until finish()
+PREVIEW_IMAGE_STORE = "preview_images.sqlite"
+
 DEFERRED_KEY = "exportimport.deferred"
+# Where global_obj_hook stores the deferred data: "sqlite" for a sqlite-file
+# in the clienthome (keyed by UID) or "annotations" for an annotation on the
+# object as before.
+DEFERRED_DATA_STORE = "sqlite"
+DEFERRED_DATA_FILENAME = "deferred_import_data.sqlite"
 DEFERED_FIELDS = ["_tile_data", "contacts", "fhnw_info_event", "_form_data"]
 
 
@@ -96,10 +173,6 @@ IMAGE_ITEM_TEMPLATE = {
     "workflow_history": {},
 }
 
-RELATION_TEMPLATE = {
-    "relationship": "preview_image_link",
-}
-
 
 class CustomImportContent(ImportContent):
 
@@ -110,9 +183,33 @@ class CustomImportContent(ImportContent):
     def __init__(self, *args, **kwargs):
         super(CustomImportContent, self).__init__(*args, **kwargs)
 
-        self.urls_with_preview_image = {}
-
-        self.items_without_parent = []
+        # preview images of the imported items, kept on disk until finish()
+        self.urls_with_preview_image = PreviewImageStore(
+            os.path.join(getConfiguration().clienthome, PREVIEW_IMAGE_STORE)
+        )
+        self.uuid_generator = None
+        self.commit_policy = None
+        self.deferred_data = get_deferred_data_store()
+        self.progress = None
+        # whether an interrupted import is continued
+        self.resuming = False
+        # (UID, object) of the last item global_obj_hook saw, for mark_done
+        self.handled_object = None
+        self.indexing_recorder = None
+        self.url_normalizer = None
+
+        # items whose container is missing are logged to this file
+        self.orphans = OrphanLog(getConfiguration().clienthome)
+
+        # digest -> blob_path, size and content-type of exports with blob_digests
+        self.blob_manifest = {}
+        # (digest, field class) -> first imported field value using that blob
+        self.blobs_by_digest = {}
+        self.imported_digests = set()
+        self.prefetcher = None
+
+        # deleted and moved items of a delta export
+        self.tombstones = None
 
         # Here is also the place to handle additional data you get from
         # other files.
@@ -121,8 +218,128 @@ class CustomImportContent(ImportContent):
         # with open(filepath, "r") as f:
         #   <process this file here and store it on this object>
 
+    def __call__(
+        self,
+        jsonfile=None,
+        return_json=False,
+        limit=None,
+        server_file=None,
+        iterator=None,
+        server_directory=False,
+    ):
+        path = self.get_server_path(server_file) if server_file else None
+        if path and not jsonfile:
+            self.blob_manifest = load_blob_manifest(path)
+            self.tombstones = load_tombstones(path)
+            # Streamed exports (a jsonl-file or a directory of jsonl-chunks) are
+            # read line by line and passed on as iterator.
+            if not server_file.endswith(".json") and is_jsonl_source(path):
+                logger.info(f"Using streamed server file {path}")
+                start = None
+                if RESUME_IMPORT:
+                    self.progress = ImportProgress(path)
+                    start = self.progress.load()
+                    if start or len(self.progress):
+                        self.resuming = True
+                        # the orphans logged before the interruption are
+                        # not read again
+                        self.orphans.resume()
+                iterator = self.track_progress(iter_jsonl_positions(path, start))
+                server_file = None
+        try:
+            return super().__call__(
+                jsonfile=jsonfile,
+                return_json=return_json,
+                limit=limit,
+                server_file=server_file,
+                iterator=iterator,
+                server_directory=server_directory,
+            )
+        finally:
+            if self.indexing_recorder is not None:
+                # objects still in the index queue are recorded as well
+                processQueue()
+                uninstall_recording_processor(*self.indexing_recorder)
+                self.indexing_recorder = None
+
+    def track_progress(self, positioned_items):
+        """Yield the items of the stream, skipping the ones imported before."""
+        skipped = 0
+        for position, item in positioned_items:
+            if self.progress is None:
+                yield item
+                continue
+            if item.get("UID") in self.progress:
+                skipped += 1
+                continue
+            self.progress.consumed(position)
+            item[STREAM_POSITION_KEY] = position
+            yield item
+        if skipped:
+            logger.info(f"Skipped {skipped} items imported by an earlier run")
+
+    def mark_done(self, items):
+        """Mark an item as imported and its position as done once it was handled.
+
+        The upstream import asks for the next item when it is done with the
+        current one. Its UID is only recorded if the object global_obj_hook
+        saw is still in its container (it is removed when a later step fails).
+        """
+        for item in items:
+            position = item.pop(STREAM_POSITION_KEY, None)
+            self.handled_object = None
+            yield item
+            uid, obj = self.handled_object or (None, None)
+            self.handled_object = None
+            if uid and uid == item.get("UID") and is_contained(obj):
+                self.progress.add(uid)
+            if position is not None:
+                self.progress.done(tuple(position))
+
+    @property
+    def server_files(self):
+        listing = super().server_files
+        for directory in self.import_paths:
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name in listing:
+                    continue
+                if is_jsonl_source(os.path.join(directory, name)):
+                    listing.append(name)
+        listing.sort()
+        return listing
+
+    def get_server_path(self, server_file):
+        for directory in self.import_paths:
+            path = os.path.join(directory, server_file)
+            if os.path.exists(path):
+                return path
+
     def start(self):
         self.view_names_found = []
+        UID_PATHS.clear()
+        if not self.resuming:
+            # preview images of an earlier import must not be added to this one
+            self.urls_with_preview_image.remove()
+
+        if self.request.get("deferred_indexing"):
+            self.indexing_recorder = install_recording_processor(
+                deferred_indexing_path()
+            )
+
+        if self.commit:
+            self.commit_policy = CommitPolicy(
+                self.context._p_jar,
+                max_items=self.commit,
+                max_objects=COMMIT_MAX_OBJECTS,
+                max_bytes=COMMIT_MAX_BYTES,
+                max_blob_bytes=COMMIT_MAX_BLOB_BYTES,
+                max_seconds=COMMIT_MAX_SECONDS,
+                savepoint_items=COMMIT_SAVEPOINT_ITEMS,
+            )
+            # commit_hook is called for every item and asks the policy
+            self.commit = 1
 
         # Disable versioning for contenttypes
         types_with_versioning = []
@@ -141,93 +358,156 @@ class CustomImportContent(ImportContent):
         IAnnotations(portal)["types_with_versioning"] = types_with_versioning
         transaction.commit()
 
+        if self.tombstones:
+            self.apply_tombstones()
+
+    def apply_tombstones(self):
+        """Move and delete items like in the source site since the last delta."""
+        moved = deleted = 0
+        for item in self.tombstones.get("moved", []):
+            obj = api.content.get(UID=item["UID"])
+            if obj is None:
+                continue
+            # the path in the old site without the id of the site
+            parent_path, _, new_id = item["to"].split("/", 2)[-1].rpartition("/")
+            if parent_path:
+                parent = api.content.get(path=f"/{parent_path}")
+            else:
+                parent = api.portal.get()
+            if parent is None:
+                logger.warning(f"Cannot move {item['UID']}: {item['to']} is missing")
+                continue
+            if obj.getPhysicalPath() == (*parent.getPhysicalPath(), new_id):
+                continue
+            api.content.move(source=obj, target=parent, id=new_id)
+            moved += 1
+
+        for item in self.tombstones.get("deleted", []):
+            obj = api.content.get(UID=item["UID"])
+            if obj is None:
+                continue
+            api.content.delete(obj, check_linkintegrity=False)
+            deleted += 1
+        transaction.commit()
+        logger.info(f"Moved {moved} and deleted {deleted} items of the delta export")
+
     def finish(self):
         # just to make sure that everything before is commited
+        self.deferred_data.commit()
         transaction.commit()
+        if self.progress is not None:
+            self.progress.commit()
+
+        self.import_preview_images()
+        self.urls_with_preview_image.remove()
+        # after the preview images, global_obj_hook also writes for them
+        self.deferred_data.close()
+        if self.progress is not None:
+            # the import is complete, a new one starts from the beginning
+            self.progress.clear()
+        logger.info(f"UID paths for collection queries: {UID_PATHS.stats()}")
+
+        # summary of the content without parents
+        filepath = self.orphans.write_summary()
+        if filepath:
+            msg = (
+                f"Saved {self.orphans.count} items without parent to "
+                f"{', '.join(self.orphans.writer.files)} (summary in {filepath})"
+            )
+            logger.info(msg)
+            api.portal.show_message(msg, self.request)
 
+    def import_preview_images(self):
+        """Create the preview images as Image items in the objects they belong to.
+
+        The entries are streamed from the PreviewImageStore, the objects are
+        found by the path global_obj_hook recorded when they were imported.
+        If the import commits, the images are committed in batches by count and
+        size (see PreviewImageBatches). The relations between the objects and
+        their preview images are added to the BTree on the portal.
+        """
         logger.info("Starting to import preview images...")
-        preview_image_relations = []
-        added_preview_image_objs = []
+        relations = preview_image_relations(api.portal.get())
+        root = self.context.getPhysicalRoot()
+        self.urls_with_preview_image.commit()
+        total = len(self.urls_with_preview_image)
+        created = missing = 0
+        batches = PreviewImageBatches(
+            commit=bool(self.commit),
+            max_items=PREVIEW_IMAGE_COMMIT,
+            max_bytes=PREVIEW_IMAGE_COMMIT_BYTES,
+            savepoint_items=PREVIEW_IMAGE_SAVEPOINT,
+        )
+        start = time.perf_counter()
 
         # add preview images and store relations on site
-        for index, (url, image_value) in enumerate(
+        for index, (url, image_value, path) in enumerate(
             self.urls_with_preview_image.items(), start=1
         ):
-            path = urlparse(url).path
-            obj_with_preview_image = api.content.get(path)
+            obj_with_preview_image = None
+            if path:
+                obj_with_preview_image = root.unrestrictedTraverse(path, None)
+            if obj_with_preview_image is None:
+                path = urlparse(url).path
+                obj_with_preview_image = api.content.get(path)
 
             if not obj_with_preview_image:
                 logger.info(
                     f"Could not find object with path {path} during preview "
                     "image import"
                 )
+                missing += 1
                 continue
 
-            if not index % 100:
-                logger.info(f"Imported {index} items...")
-                transaction.savepoint()
-
             obj, is_new = self.create_image_obj(
                 obj_with_preview_image, image_value, index, prefix_id="preview"
             )
 
             if is_new:
-                added_preview_image_objs.append(obj.absolute_url())
-
-                if self.commit and not len(added_preview_image_objs) % self.commit:
-                    self.commit_hook(added_preview_image_objs, index)
+                created += 1
+                due = batches.add(image_value.get("size"))
+                if due == "commit":
+                    self.commit_transaction(
+                        f"Committing after {created} created preview images..."
+                    )
+                elif due == "savepoint":
+                    transaction.savepoint(optimistic=True)
 
-            # now let's create the relation
-            new_relation = RELATION_TEMPLATE.copy()
-            new_relation["from_uuid"] = obj_with_preview_image.UID()
-            new_relation["to_uuid"] = obj.UID()
-            preview_image_relations.append(new_relation)
+            # now let's store the relation
+            relations[obj_with_preview_image.UID()] = obj.UID()
 
-        transaction.commit()
-        logger.info("Finished importing preview images...")
-
-        logger.info("Starting to store preview image relations to portal...")
-        portal = api.portal.get()
-        IAnnotations(portal)["preview_image_relations"] = preview_image_relations
+            if not index % PREVIEW_IMAGE_LOG_EVERY:
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    f"Handled {index} of {total} preview images "
+                    f"({index / elapsed:.1f} items/s)"
+                )
 
         transaction.commit()
-        logger.info("Finished storing preview image relations to portal...")
-
-        # export content without parents
-        if self.items_without_parent:
-            try:
-                data = json.dumps(self.items_without_parent, sort_keys=True, indent=4)
-            except (ValueError, TypeError):
-                with open("items_without_parent_error.json", "w") as f:
-                    for item in self.items_without_parent:
-                        json_item = json.dumps(item, sort_keys=True, indent=4)
-                        f.write(json_item + "\n")
-
-            number = len(self.items_without_parent)
-            cfg = getConfiguration()
-            filename = "content_without_parent.json"
-            filepath = os.path.join(cfg.clienthome, filename)
-            with open(filepath, "w") as f:
-                f.write(data)
-            msg = f"Saved {number} items without parent to {filepath}"
-            logger.info(msg)
-            api.portal.show_message(msg, self.request)
+        logger.info(
+            f"Finished importing preview images: {created} created, "
+            f"{missing} without object in {time.perf_counter() - start:.1f}s"
+        )
 
     def create_image_obj(self, container, image_value, index, prefix_id=None):
         # let's create a new image item
+        if self.uuid_generator is None:
+            self.uuid_generator = getUtility(IUUIDGenerator)
+            self.url_normalizer = getUtility(IURLNormalizer)
         new_item = IMAGE_ITEM_TEMPLATE.copy()
-        new_item_uuid = getUtility(IUUIDGenerator)()
+        new_item_uuid = self.uuid_generator()
 
         filename = image_value.get("filename", "preview-image")
         new_filename = f"{prefix_id}_{filename}" if prefix_id else filename
-        new_id = getUtility(IURLNormalizer).normalize(new_filename)
+        new_id = self.url_normalizer.normalize(new_filename)
 
-        new_item["@id"] = f"{container.absolute_url()}/{new_id}"
+        container_url = container.absolute_url()
+        new_item["@id"] = f"{container_url}/{new_id}"
         new_item["UID"] = new_item_uuid
         new_item["id"] = new_id
         new_item["image"] = image_value
         new_item["parent"] = {
-            "@id": f"{container.absolute_url()}",
+            "@id": container_url,
             "@type": container.portal_type,
             "UID": container.UID(),
         }
@@ -247,20 +527,41 @@ class CustomImportContent(ImportContent):
         return obj, is_new
 
     def commit_hook(self, added, index):
-        msg = f"Committing after {added} created items..."
+        policy = self.commit_policy
+        reason = None
+        if policy is not None:
+            policy.add()
+            reason = policy.due()
+            if reason is None:
+                return
+            msg = (
+                f"Committing after {len(added)} created items "
+                f"({policy.describe()}, {reason} budget reached)..."
+            )
+        else:
+            msg = f"Committing after {len(added)} created items..."
+        self.commit_transaction(msg, reason)
+        if self.orphans.count:
+            logger.info(f"{self.orphans.count} items without parent so far")
+
+    def commit_transaction(self, msg, reason=None):
+        """Commit the transaction together with the stores of the import."""
         logger.info(msg)
         transaction.get().note(msg)
+        # first, so no preview image of a committed item can get lost
+        self.urls_with_preview_image.commit()
+        self.deferred_data.commit()
         transaction.commit()
-        if self.items_without_parent:
-            data = json.dumps(self.items_without_parent, sort_keys=True, indent=4)
-            number = len(self.items_without_parent)
-            cfg = getConfiguration()
-            filename = f"content_without_parent_{index}.json"
-            filepath = os.path.join(cfg.clienthome, filename)
-            with open(filepath, "w") as f:
-                f.write(data)
-            msg = f"Saved {number} items without parent to {filepath}"
-            logger.info(msg)
+        if self.commit_policy is not None:
+            self.commit_policy.committed(reason)
+        if self.progress is not None:
+            self.progress.commit()
+
+    def handle_container(self, item):
+        container = super().handle_container(item)
+        if container is None:
+            self.orphans.add(item)
+        return container
 
     def global_dict_hook(self, item):
         if FILTER_IMPORTED_TYPES and item["@type"] not in IMPORTED_TYPES:
@@ -392,7 +693,7 @@ class CustomImportContent(ImportContent):
         image = item.get("image")
         if image and item.get("@type", "") != "Image":
             item.pop("image")
-            self.urls_with_preview_image[item["@id"]] = image
+            self.urls_with_preview_image.add(item["@id"], image)
 
         item["workflow_history"] = {}
         # removed layout so views work on the new site
@@ -413,13 +714,116 @@ class CustomImportContent(ImportContent):
                 item[DEFERRED_KEY][fieldname] = item.pop(fieldname)
         return item
 
+    def import_new_content(self, data):
+        prefetching = waiting = None
+        if PREFETCH_WORKERS:
+            self.prefetcher = BlobPrefetcher(
+                self.item_blob_paths,
+                self.resolve_blob_path,
+                blob_temp_directory(self.context),
+                workers=PREFETCH_WORKERS,
+                window=PREFETCH_WINDOW,
+            )
+            data = prefetching = self.prefetcher(data)
+        if DEFER_MISSING_PARENTS:
+            # a parent is imported before the next item is taken
+            data = waiting = self.wait_for_parents(data)
+        if self.progress is not None:
+            data = self.mark_done(data)
+        try:
+            added = super().import_new_content(data)
+        finally:
+            if waiting is not None:
+                waiting.close()
+            if prefetching is not None:
+                # stops the workers and removes unused copies
+                prefetching.close()
+                self.prefetcher = None
+        self.imported_count = len(added)
+        return added
+
+    def wait_for_parents(self, items):
+        """Yield items so that no item comes before its parent.
+
+        An item whose parent is neither in the portal nor imported yet waits
+        in a ParentQueue until an item with the UID of that parent was
+        imported. Items still waiting at the end are yielded parents first.
+        """
+        queue = ParentQueue(
+            getConfiguration().clienthome, max_in_memory=MAX_DEFERRED_IN_MEMORY
+        )
+        catalog = api.portal.get_tool("portal_catalog")
+        ready = deque()
+        deferred = released = 0
+        try:
+            for item in items:
+                parent_uid = self.missing_parent_uid(item, catalog)
+                if parent_uid:
+                    queue.defer(parent_uid, item)
+                    deferred += 1
+                    continue
+                ready.append(item)
+                while ready:
+                    item = ready.popleft()
+                    yield item
+                    # the item is imported now, its children can follow
+                    if item.get("UID") and len(queue):
+                        children = queue.release(item["UID"])
+                        released += len(children)
+                        ready.extend(children)
+            if deferred:
+                logger.info(
+                    f"{deferred} items waited for their parent, {released} were "
+                    f"imported after it, {len(queue)} have no parent in this import"
+                )
+            yield from queue.remaining()
+        finally:
+            queue.close()
+
+    def missing_parent_uid(self, item, catalog):
+        """The UID of the parent of item if it does not exist yet, else None."""
+        parent = item.get("parent") or {}
+        parent_uid = parent.get("UID")
+        if not parent_uid or parent.get("@type") == "Plone Site":
+            return None
+        if catalog.unrestrictedSearchResults(UID=parent_uid):
+            return None
+        return parent_uid
+
+    def item_blob_paths(self, item):
+        """The blob paths import_blob_paths will need for item."""
+        paths = []
+        for value in item.values():
+            if not isinstance(value, dict):
+                continue
+            blob_digest = value.get("blob_digest")
+            if blob_digest:
+                if blob_digest in self.blob_manifest and (
+                    blob_digest not in self.imported_digests
+                ):
+                    paths.append(self.blob_manifest[blob_digest]["blob_path"])
+            elif value.get("blob_path"):
+                paths.append(value["blob_path"])
+        return paths
+
+    def resolve_blob_path(self, blob_path):
+        return get_absolute_blob_path(self.context, blob_path)
+
     def global_obj_hook(self, obj, item):
+        if self.progress is not None:
+            self.handled_object = (item.get("UID"), obj)
+        self.urls_with_preview_image.set_path(
+            item["@id"], "/".join(obj.getPhysicalPath())
+        )
+        # used to rewrite the paths in queries of collections and listings
+        UID_PATHS.add(obj.UID(), obj.absolute_url_path())
         deferred = item.get(DEFERRED_KEY, {})
         if deferred:
-            annotations = IAnnotations(obj)
-            annotations[DEFERRED_KEY] = {}
-            for key, value in deferred.items():
-                annotations[DEFERRED_KEY][key] = value
+            self.deferred_data.set(obj.UID(), deferred, obj)
+        else:
+            # the store is kept between imports, the data of an earlier
+            # import of this item must not be applied to it
+            self.deferred_data.delete(obj.UID(), obj)
         return obj
 
     def dict_hook_collection(self, item):
@@ -442,19 +846,19 @@ class CustomImportContent(ImportContent):
 
         return item
 
-    def import_blob_paths(self, new, item):
+    def import_blob_paths(self, new, item):  # noqa: C901
         for key, value in item.items():
-            # Look for dictionaries with a blob_path key.
+            # Look for dictionaries with a blob_path or blob_digest key.
             if not isinstance(value, dict):
                 continue
             blob_path = value.get("blob_path")
+            blob_digest = value.get("blob_digest")
+            if blob_digest:
+                if blob_digest not in self.blob_manifest:
+                    raise ValueError(f"Blob digest {blob_digest} is not in manifest!")
+                blob_path = self.blob_manifest[blob_digest]["blob_path"]
             if not blob_path:
                 continue
-            abs_blob_path = get_absolute_blob_path(new, blob_path)
-            if not abs_blob_path:
-                # continue
-                # __traceback_info__ = item
-                raise ValueError(f"Blob path {blob_path} does not exist!")
 
             # Determine the class to use: file or image.
             filename = value["filename"]
@@ -468,15 +872,125 @@ class CustomImportContent(ImportContent):
             else:
                 klass = NamedBlobFile
 
-            # Write the field.
+            # Reuse the blob of an identical file imported before.
+            imported = self.blobs_by_digest.get((blob_digest, klass))
+            if imported is not None:
+                field_value = copy.copy(imported)
+                field_value.contentType = content_type
+                field_value.filename = filename
+                setattr(new, key, field_value)
+                continue
+
+            prefetched = self.prefetcher.pop(blob_path) if self.prefetcher else None
+            if prefetched:
+                self.count_blob_bytes(prefetched)
+                field_value = self.consume_blob_file(
+                    klass, prefetched, content_type, filename
+                )
+            else:
+                abs_blob_path = get_absolute_blob_path(new, blob_path)
+                if not abs_blob_path:
+                    # continue
+                    # __traceback_info__ = item
+                    raise ValueError(f"Blob path {blob_path} does not exist!")
+                self.count_blob_bytes(abs_blob_path)
+
+                # Write the field.
+                field_value = self.create_blob_value(
+                    new, klass, abs_blob_path, content_type, filename
+                )
+            setattr(new, key, field_value)
+            if blob_digest:
+                self.blobs_by_digest[(blob_digest, klass)] = field_value
+                self.imported_digests.add(blob_digest)
+
+    def count_blob_bytes(self, path):
+        if self.commit_policy is not None:
+            self.commit_policy.add(items=0, blob_bytes=os.path.getsize(path))
+
+    def create_blob_value(self, obj, klass, abs_blob_path, content_type, filename):
+        """Create a NamedBlobFile/-Image without reading the file into memory.
+
+        The blob consumes a hard link to the exported blob (or a copy made in
+        chunks if linking is not possible), the source stays untouched.
+        """
+        if not STREAM_BLOBS:
             with open(abs_blob_path, "rb") as myfile:
                 blobdata = myfile.read()
-            field_value = klass(
-                data=blobdata,
-                contentType=content_type,
-                filename=filename,
-            )
-            setattr(new, key, field_value)
+            return klass(data=blobdata, contentType=content_type, filename=filename)
+
+        temp_path = link_or_copy_blob(abs_blob_path, blob_temp_directory(obj))
+        return self.consume_blob_file(klass, temp_path, content_type, filename)
+
+    def consume_blob_file(self, klass, temp_path, content_type, filename):
+        """Create the field value from a temporary file that is moved into the blob."""
+        try:
+            # BufferedReaderStorable hands the file over with Blob.consumeFile
+            with open(temp_path, "rb") as blobfile:
+                return klass(data=blobfile, contentType=content_type, filename=filename)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def blob_temp_directory(obj):
+    """The temporary directory of the blob storage (same filesystem)."""
+    try:
+        return obj._p_jar.db().storage.temporaryDirectory()
+    except AttributeError:
+        return tempfile.gettempdir()
+
+
+def link_or_copy_blob(source, directory):
+    """Return a new file in directory with the content of source.
+
+    A hard link needs neither memory nor disk space. Across filesystems the
+    file is copied in chunks.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix="import-", suffix=".blob")
+    os.close(fd)
+    os.remove(temp_path)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    return temp_path
+
+
+def load_blob_manifest(path):
+    """Return the blob manifests written next to or inside an export."""
+    root = os.path.splitext(path)[0] if os.path.isfile(path) else path
+    filepaths = [f"{root.rstrip(os.sep)}{BLOB_MANIFEST_SUFFIX}"]
+    if os.path.isdir(path):
+        filepaths += sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if name.endswith(BLOB_MANIFEST_SUFFIX)
+        )
+    manifest = {}
+    for filepath in filepaths:
+        if os.path.isfile(filepath):
+            with open(filepath) as f:
+                manifest.update(json.load(f))
+            logger.info(f"Loaded blob manifest {filepath}")
+    return manifest
+
+
+def load_tombstones(path):
+    """Return the tombstones written next to a delta export."""
+    root = os.path.splitext(path)[0] if os.path.isfile(path) else path
+    filepath = f"{root.rstrip(os.sep)}{TOMBSTONES_SUFFIX}"
+    if not os.path.isfile(filepath):
+        return None
+    with open(filepath) as f:
+        return json.load(f)
+
+
+def is_jsonl_source(path):
+    """A jsonl-file or a directory holding jsonl-chunks."""
+    if os.path.isdir(path):
+        return bool(jsonl_files(path))
+    return path.endswith(".jsonl")
 
 
 def convert_and_pop_field(item, old_field, new_field):
@@ -485,7 +999,26 @@ def convert_and_pop_field(item, old_field, new_field):
     return item
 
 
-def fix_collection_query(query):
+# thanks github copilot for generating this pattern :)
+UUID_QUERY_PATTERN = re.compile(r"^[0-9a-fA-F]{32}::[-+]?\d+$")
+
+
+def lookup_uid_path(uid):
+    # we cant use the plone.app.uuid.utils methods because they are
+    # using the catalog which is not up-to-date in any case.
+    obj = api.content.get(UID=uid)
+    if obj:
+        return obj.absolute_url_path()
+    return None
+
+
+# paths of the imported objects by UID
+UID_PATHS = UIDPathResolver(lookup=lookup_uid_path)
+
+
+def fix_collection_query(query, resolve_uid_path=None):
+    if resolve_uid_path is None:
+        resolve_uid_path = UID_PATHS
     fixed_query = []
 
     indexes_to_fix = [
@@ -513,19 +1046,18 @@ def fix_collection_query(query):
             continue
 
         # try to convert uuids to paths if possible.
-        if crit["o"].endswith("absolutePath") and "v" in crit:
-            # thanks github copilot for generating this pattern :)
-            uuid_query_pattern = r"^[0-9a-fA-F]{32}::[-+]?\d+$"
-            if re.match(uuid_query_pattern, crit["v"]) is not None:
-                # ok now we now it's the pattern we expect
-                uuid, depth = crit["v"].split("::")
-
-                # we cant use the plone.app.uuid.utils methods because they are
-                # using the catalog which is not up-to-date in any case.
-                obj = api.content.get(UID=uuid)
-                if obj:
-                    path = obj.absolute_url_path().replace("/Plone", "")
-                    crit["v"] = f"{path}::{depth}"
+        if (
+            crit["o"].endswith("absolutePath")
+            and "v" in crit
+            and UUID_QUERY_PATTERN.match(crit["v"]) is not None
+        ):
+            # ok now we now it's the pattern we expect
+            uuid, depth = crit["v"].split("::")
+
+            path = resolve_uid_path(uuid)
+            if path:
+                path = path.replace("/Plone", "")
+                crit["v"] = f"{path}::{depth}"
 
         if crit["o"].endswith("relativePath") and "v" in crit and crit["v"] == "..":
             # relativePath no longer accepts ..
@@ -597,6 +1129,30 @@ def fix_collection_query(query):
     return fixed_query
 
 
-def get_defered_import_data(obj):
-    annotations = IAnnotations(obj)
-    return annotations.get(DEFERRED_KEY, {})
+def is_contained(obj):
+    """Whether obj is (still) the object with its id in its container."""
+    parent = aq_parent(aq_inner(obj))
+    if parent is None or not hasattr(aq_base(parent), "_getOb"):
+        return False
+    found = parent._getOb(obj.getId(), None)
+    return found is not None and aq_base(found) is aq_base(obj)
+
+
+def deferred_indexing_path():
+    return os.path.join(getConfiguration().clienthome, DEFERRED_INDEXING_FILENAME)
+
+
+def get_deferred_data_store():
+    if DEFERRED_DATA_STORE == "annotations":
+        return AnnotationDeferredDataStore(DEFERRED_KEY)
+    filepath = os.path.join(getConfiguration().clienthome, DEFERRED_DATA_FILENAME)
+    return SqliteDeferredDataStore(filepath)
+
+
+def get_defered_import_data(obj, store):
+    """The deferred data of obj from store (see get_deferred_data_store)."""
+    data = store.get(obj.UID(), obj)
+    if not data:
+        # stored in an annotation by imports before the store was used
+        data = IAnnotations(obj).get(DEFERRED_KEY, {})
+    return data
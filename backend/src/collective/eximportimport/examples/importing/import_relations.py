@@ -1,3 +1,4 @@
+from BTrees.OOBTree import OOBTree
 from collective.exportimport.import_other import ImportRelations
 from operator import itemgetter
 from plone import api
@@ -10,6 +11,10 @@ import transaction
 
 logger = logging.getLogger(__name__)
 
+# OOBTree from_uuid -> to_uuid on the portal, filled by CustomImportContent
+PREVIEW_IMAGE_RELATIONS_KEY = "preview_image_relations"
+PREVIEW_IMAGE_RELATIONSHIP = "preview_image_link"
+
 
 def batch(iterable, batch_size=500):
     length = len(iterable)
@@ -22,6 +27,39 @@ RELATIONSHIP_FIELD_MAPPING = {
 }
 
 
+def preview_image_relations(portal):
+    """The preview image relations stored on the portal, created if missing.
+
+    A BTree only writes the buckets that change, so adding relations does not
+    rewrite all of them with every commit.
+    """
+    annotations = IAnnotations(portal)
+    relations = annotations.get(PREVIEW_IMAGE_RELATIONS_KEY)
+    if not isinstance(relations, OOBTree):
+        # convert the list of relation dicts of older imports
+        tree = OOBTree()
+        for rel in relations or []:
+            tree[rel["from_uuid"]] = rel["to_uuid"]
+        annotations[PREVIEW_IMAGE_RELATIONS_KEY] = relations = tree
+    return relations
+
+
+def iter_preview_image_relations(portal):
+    """Yield the preview image relations stored on the portal as relation dicts."""
+    relations = IAnnotations(portal).get(PREVIEW_IMAGE_RELATIONS_KEY)
+    if relations is None:
+        return
+    if not isinstance(relations, OOBTree):
+        yield from relations
+        return
+    for from_uuid, to_uuid in relations.items():
+        yield {
+            "relationship": PREVIEW_IMAGE_RELATIONSHIP,
+            "from_uuid": from_uuid,
+            "to_uuid": to_uuid,
+        }
+
+
 class CustomImportRelations(ImportRelations):
 
     def import_relations(self, data):
@@ -47,12 +85,6 @@ class CustomImportRelations(ImportRelations):
         all_fixed_relations = []
         portal = api.portal.get()
 
-        # Add also preview_image relations stored in annotations
-        preview_image_relations = IAnnotations(portal).get(
-            "preview_image_relations", []
-        )
-        data += preview_image_relations
-
         for rel in data:
             if rel["relationship"] in ignore:
                 continue
@@ -78,6 +110,28 @@ class CustomImportRelations(ImportRelations):
             transaction.commit()
             start += batch_size
 
-        if "preview_image_relations" in IAnnotations(portal):
-            del IAnnotations(portal)["preview_image_relations"]
+        # The preview image relations stored in annotations are streamed in
+        # batches after the others. Every item has only one, so they do not
+        # need to be sorted together with the other relations.
+        restored = 0
+        preview_relations = []
+        for rel in iter_preview_image_relations(portal):
+            rel["from_attribute"] = self.get_from_attribute(rel)
+            preview_relations.append(rel)
+            if len(preview_relations) >= batch_size:
+                restored += self.restore_preview_image_relations(preview_relations)
+                preview_relations = []
+        restored += self.restore_preview_image_relations(preview_relations)
+        if restored:
+            logger.info(f"Restored {restored} preview image relations.")
+
+        if PREVIEW_IMAGE_RELATIONS_KEY in IAnnotations(portal):
+            del IAnnotations(portal)[PREVIEW_IMAGE_RELATIONS_KEY]
+        transaction.commit()
+
+    def restore_preview_image_relations(self, relations):
+        if not relations:
+            return 0
+        relationhelper.restore_relations(all_relations=relations)
         transaction.commit()
+        return len(relations)
@@ -0,0 +1,182 @@
+"""Index content in batches: deferred after the import or as full rebuild."""
+
+from .batches import ResumableBatches
+from .batches import walk_content
+from plone.base.utils import base_hasattr
+from plone.base.utils import safe_callable
+from Products.CMFCore.indexing import PortalCatalogProcessor
+from Products.CMFCore.interfaces import IPortalCatalogQueueProcessor
+from Products.CMFCore.utils import getToolByName
+from zope.annotation.interfaces import IAnnotations
+from zope.component import getGlobalSiteManager
+
+import logging
+import os
+import transaction
+
+
+try:
+    from plone.app.discussion.interfaces import DISCUSSION_ANNOTATION_KEY
+except ImportError:
+    DISCUSSION_ANNOTATION_KEY = None
+
+logger = logging.getLogger(__name__)
+
+PROCESSOR_NAME = "portal-catalog"
+
+# Indexes still updated during the import: the importer finds parents and
+# existing content by UID and catalog searches filter on path, security and
+# effective dates.
+IMPORT_INDEXES = [
+    "UID",
+    "path",
+    "allowedRolesAndUsers",
+    "effectiveRange",
+    "portal_type",
+    "getId",
+    "id",
+]
+
+
+class RecordingCatalogProcessor(PortalCatalogProcessor):
+    """Update only IMPORT_INDEXES and append the path of the object to a file.
+
+    Replaces the "portal-catalog" index queue processor during an import, the
+    recorded paths are indexed completely by index_recorded_paths afterwards.
+    """
+
+    def __init__(self, filepath, indexes=None):
+        self.filepath = filepath
+        self.indexes = indexes or IMPORT_INDEXES
+        self.file = open(filepath, "a")  # noqa: SIM115
+        self.last_path = None
+        self.count = 0
+
+    def record(self, obj):
+        path = "/".join(obj.getPhysicalPath())
+        if path != self.last_path:
+            self.file.write(path + "\n")
+            self.last_path = path
+            self.count += 1
+
+    def index(self, obj, attributes=None):
+        self.reindex(obj)
+
+    def reindex(self, obj, attributes=None, update_metadata=1):
+        catalog = getToolByName(obj, "portal_catalog", None)
+        if catalog is None:
+            return
+        self.record(obj)
+        # metadata of new objects is always written
+        catalog._reindexObject(obj, idxs=self.indexes, update_metadata=0)
+
+    def commit(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def install_recording_processor(filepath):
+    """Replace the portal-catalog queue processor, return (recorder, original).
+
+    The processor is a global utility, so this applies to all threads of the
+    process until uninstall_recording_processor is called.
+    """
+    gsm = getGlobalSiteManager()
+    original = gsm.getUtility(IPortalCatalogQueueProcessor, name=PROCESSOR_NAME)
+    recorder = RecordingCatalogProcessor(filepath)
+    gsm.registerUtility(recorder, IPortalCatalogQueueProcessor, name=PROCESSOR_NAME)
+    logger.info(f"Deferring catalog indexing, recording paths in {filepath}")
+    return recorder, original
+
+
+def uninstall_recording_processor(recorder, original):
+    gsm = getGlobalSiteManager()
+    gsm.registerUtility(original, IPortalCatalogQueueProcessor, name=PROCESSOR_NAME)
+    recorder.close()
+    logger.info(f"Recorded {recorder.count} paths for indexing")
+
+
+def read_recorded_paths(filepath):
+    """The unique recorded paths as tuples in path order (parents first)."""
+    if not os.path.exists(filepath):
+        return []
+    with open(filepath) as f:
+        paths = {line.rstrip("\n") for line in f if line.strip()}
+    return sorted(tuple(path.split("/")) for path in paths)
+
+
+def index_recorded_paths(portal, filepath, state_path, batch_size=500):
+    """Index all recorded objects completely and remove the file.
+
+    Commits every batch_size objects, minimizes the ZODB cache and logs the
+    progress. An interrupted run continues after the last committed path.
+    Returns the number of indexed objects.
+    """
+    catalog = getToolByName(portal, "portal_catalog")
+    root = portal.getPhysicalRoot()
+    paths = read_recorded_paths(filepath)
+    batches = ResumableBatches(
+        "index imported content",
+        state_path,
+        portal._p_jar,
+        batch_size=batch_size,
+        total=len(paths),
+    )
+    for path in paths:
+        if batches.after is not None and path <= batches.after:
+            continue
+        obj = root.unrestrictedTraverse(path, None)
+        # deleted or moved after it was recorded (and not acquired)
+        found = obj is not None and obj.getPhysicalPath() == path
+        if found:
+            catalog._reindexObject(obj)
+        batches.done(path, processed=found)
+    indexed = batches.finish()
+    if os.path.exists(filepath):
+        os.remove(filepath)
+    return indexed
+
+
+def rebuild_catalog(portal, state_path, batch_size=500):
+    """Clear the catalog and index all content again, like clearFindAndRebuild.
+
+    The site is walked in path order instead of ZopeFindAndApply, objects are
+    indexed in batches with a commit and a minimized ZODB cache after each.
+    An interrupted rebuild continues after the last committed path without
+    clearing the catalog again. Returns the number of indexed objects.
+    """
+    catalog = getToolByName(portal, "portal_catalog")
+    batches = ResumableBatches(
+        "rebuild catalog", state_path, portal._p_jar, batch_size=batch_size
+    )
+    if batches.after is None:
+        catalog.manage_catalogClear()
+        transaction.commit()
+    idxs = list(catalog.indexes())
+    for path, obj in walk_content(portal, batches.after):
+        indexed = obj is not catalog and index_content(catalog, obj, idxs)
+        batches.done(path, processed=indexed)
+    return batches.finish()
+
+
+def index_content(catalog, obj, idxs):
+    """Index obj and its comments if it is content, return whether it was."""
+    if not base_hasattr(obj, "reindexObject") or not safe_callable(obj.reindexObject):
+        return False
+    try:
+        catalog._reindexObject(obj, idxs=idxs)
+        # index conversations from plone.app.discussion
+        annotations = IAnnotations(obj)
+        if (
+            DISCUSSION_ANNOTATION_KEY is not None
+            and DISCUSSION_ANNOTATION_KEY in annotations
+        ):
+            conversation = annotations[DISCUSSION_ANNOTATION_KEY].__of__(obj)
+            for comment in conversation.getComments():
+                catalog._reindexObject(comment, idxs=idxs)
+    except TypeError:
+        # Catalogs have 'indexObject' as well, but they take different args
+        return False
+    return True
@@ -0,0 +1,64 @@
+from pathlib import Path
+
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def jsonl_files(path):
+    """Return the jsonl-files of a streamed export.
+
+    path is either a single jsonl-file or a directory holding chunk files.
+    A manifest.json in the directory (written by a sharded export) defines
+    the order of the files.
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return [path]
+    manifest = path / "manifest.json"
+    if manifest.exists():
+        files = json.loads(manifest.read_text())["files"]
+        return [path / filename for filename in files]
+    return sorted(path.glob("*.jsonl"))
+
+
+def iter_jsonl(path):
+    """Yield the items of a streamed export one at a time.
+
+    Only one line is held in memory. An incomplete last line (e.g. from an
+    interrupted export) is logged and skipped.
+    """
+    for _position, item in iter_jsonl_positions(path):
+        yield item
+
+
+def iter_jsonl_positions(path, start=None):
+    """Yield (position, item) for the items of a streamed export.
+
+    position is (index of the file, byte offset of the line) and can be passed
+    as start to continue reading at that item.
+    """
+    files = jsonl_files(path)
+    first_file, offset = start or (0, 0)
+    for index in range(first_file, len(files)):
+        filepath = files[index]
+        logger.info(f"Reading items from {filepath}")
+        with open(filepath, "rb") as f:
+            if index == first_file and offset:
+                f.seek(offset)
+            else:
+                offset = 0
+            for line in f:
+                position = (index, offset)
+                offset += len(line)
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield position, json.loads(line)
+                except ValueError:
+                    logger.warning(
+                        f"Skipping invalid json in {filepath} at byte {position[1]}"
+                    )
@@ -0,0 +1,99 @@
+"""Update the link integrity information in resumable batches."""
+
+from .batches import ResumableBatches
+from plone.app.linkintegrity.handlers import modifiedContent
+from plone.app.textfield import RichText
+from plone.dexterity.interfaces import IDexterityFTI
+from plone.dexterity.utils import getAdditionalSchemata
+from Products.CMFCore.utils import getToolByName
+from zope.component import queryUtility
+from zope.schema import getFieldsInOrder
+
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+BLOCKS_BEHAVIORS = ("volto.blocks", "volto.blocks.editable.layout")
+
+
+def link_fields(portal_type):
+    """Names of the rich text fields of portal_type and whether it has blocks."""
+    fti = queryUtility(IDexterityFTI, name=portal_type)
+    if fti is None:
+        return [], False
+    schemas = [*getAdditionalSchemata(portal_type=portal_type), fti.lookupSchema()]
+    fieldnames = [
+        name
+        for schema in schemas
+        for name, field in getFieldsInOrder(schema)
+        if isinstance(field, RichText)
+    ]
+    has_blocks = any(behavior in BLOCKS_BEHAVIORS for behavior in fti.behaviors)
+    return fieldnames, has_blocks
+
+
+def may_contain_links(obj, fieldnames, has_blocks):
+    """Whether the rich text or the blocks of obj may contain links."""
+    if has_blocks and getattr(obj.aq_base, "blocks", None):
+        return True
+    for name in fieldnames:
+        raw = getattr(getattr(obj.aq_base, name, None), "raw", None)
+        if raw and ("href" in raw or "src" in raw):
+            return True
+    return False
+
+
+def update_link_integrity(portal, state_path, batch_size=500, only_with_links=True):
+    """Update the link integrity references of all content.
+
+    Replaces updateLinkIntegrityInformation.update: objects are handled in
+    path order, committed every batch_size objects and an interrupted run
+    continues after the last committed path. With only_with_links only
+    objects of types with rich text fields or blocks are loaded and only
+    those with rich text containing links or with blocks are updated (enough
+    after an import into an empty site, which has no outdated references).
+    Returns the number of updated objects.
+    """
+    catalog = getToolByName(portal, "portal_catalog")
+    # the catalog returns nothing for an empty query
+    query = {"path": "/".join(portal.getPhysicalPath())}
+    fields_by_type = {}
+    if only_with_links:
+        for portal_type in catalog.uniqueValuesFor("portal_type"):
+            fieldnames, has_blocks = link_fields(portal_type)
+            if fieldnames or has_blocks:
+                fields_by_type[portal_type] = (fieldnames, has_blocks)
+        query["portal_type"] = list(fields_by_type)
+        logger.info(f"Updating link integrity of {', '.join(fields_by_type)}")
+    paths = sorted(
+        tuple(brain.getPath().split("/"))
+        for brain in catalog.unrestrictedSearchResults(**query)
+    )
+    root = portal.getPhysicalRoot()
+    batches = ResumableBatches(
+        "update link integrity",
+        state_path,
+        portal._p_jar,
+        batch_size=batch_size,
+        total=len(paths),
+    )
+    for path in paths:
+        if batches.after is not None and path <= batches.after:
+            continue
+        obj = root.unrestrictedTraverse(path, None)
+        updated = False
+        if obj is None or obj.getPhysicalPath() != path:
+            logger.error(f"Catalog inconsistency: {'/'.join(path)} not found!")
+        elif not only_with_links or may_contain_links(
+            obj, *fields_by_type.get(obj.portal_type, ([], False))
+        ):
+            try:
+                modifiedContent(obj, "dummy event parameter")
+                updated = True
+            except Exception:
+                logger.exception(
+                    f"Error updating linkintegrity-info for {obj.absolute_url()}."
+                )
+        batches.done(path, processed=updated)
+    return batches.finish()
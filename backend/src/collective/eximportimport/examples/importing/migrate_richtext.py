@@ -1,3 +1,7 @@
+from collective.eximportimport.examples.importing.commit_policy import CommitPolicy
+from collective.eximportimport.examples.importing.deferred_data import (
+    iter_with_deferred_data,
+)
 from collective.eximportimport.examples.importing.form_conversion import (
     build_mailer_settings,
 )
@@ -13,6 +17,10 @@ from collective.eximportimport.examples.importing.import_content import (
 from collective.eximportimport.examples.importing.import_content import (
     get_defered_import_data,
 )
+from collective.eximportimport.examples.importing.import_content import (
+    get_deferred_data_store,
+)
+from collective.eximportimport.examples.importing.import_content import UID_PATHS
 from logging import getLogger
 from plone import api
 from plone.app.uuid.utils import uuidToObject
@@ -194,18 +202,18 @@ def migrate_richtext_to_blocks(
     elif isinstance(portal_types, str):
         portal_types = [portal_types]
     results = 0
+    # commit by the size of the transaction to avoid memory issues
+    policy = CommitPolicy(api.portal.get()._p_jar)
+    store = get_deferred_data_store()
     for portal_type in portal_types:
-        for index, brain in enumerate(
-            api.content.find(portal_type=portal_type, sort_on="path"), start=1
+        for index, (obj, defered_data) in enumerate(
+            iter_objects_with_deferred_data(store, portal_type), start=1
         ):
-            obj = brain.getObject()
             # text = getattr(obj.aq_base, fieldname, None)
 
             blocks = {}
             blocks_layout = {"items": []}
 
-            defered_data = get_defered_import_data(obj)
-
             if obj.portal_type == "Document" and defered_data.get("_form_data"):
 
                 form_blocks, form_uuids = convert_easyform_to_volto_form(
@@ -272,19 +280,45 @@ def migrate_richtext_to_blocks(
             results += 1
             logger.debug(f"Migrated richtext to blocks for: {obj.absolute_url()}")
 
-            if not index % 50:  # every 50 items to avoid memory issues
-                logger.info(f"Committing after {index} items...")
+            policy.add()
+            reason = policy.due()
+            if reason:
+                logger.info(
+                    f"Committing after {index} items ({policy.describe()}, "
+                    f"{reason} budget reached)..."
+                )
                 transaction.commit()
+                policy.committed(reason)
 
         msg = f"Migrated {index} {portal_type} to blocks"
         logger.info(msg)
 
+    close_deferred_data_store(store)
     logger.debug(f"Total pages processed: {pagescount}")
     logger.debug(f"Total blocks created: {blockcount}")
 
     return results
 
 
+def iter_objects_with_deferred_data(store, portal_type):
+    """Objects of portal_type in path order with their deferred import data.
+
+    The deferred data of the brains is read from the store in batches.
+    """
+    brains = api.content.find(portal_type=portal_type, sort_on="path")
+    for brain, defered_data in iter_with_deferred_data(store, brains):
+        obj = brain.getObject()
+        if not defered_data:
+            defered_data = get_defered_import_data(obj, store)
+        yield obj, defered_data
+
+
+def close_deferred_data_store(store):
+    """Close the deferred data store and log the stats of the UID path cache."""
+    store.close()
+    logger.info(f"UID paths for listing queries: {UID_PATHS.stats()}")
+
+
 def create_slate_block(text):
     block = {"@type": "slate", "value": [{"type": "p", "children": [{"text": text}]}]}
     return block
@@ -0,0 +1,74 @@
+from ..exporting.jsonl import JsonlWriter
+from .jsonl import iter_jsonl
+from collections import Counter
+
+import json
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+
+class OrphanLog:
+    """Append items whose container is missing to <basename>.jsonl.
+
+    Every item is written and flushed right away and not kept in memory. The
+    file can be imported again with @@custom_import_content once the parents
+    exist. Only the number of orphans per parent is collected for the summary.
+    """
+
+    def __init__(self, directory, basename="content_without_parent"):
+        self.directory = directory
+        self.basename = basename
+        self.writer = JsonlWriter(directory, basename)
+        self.parents = Counter()
+        # UIDs of the orphans logged by an interrupted import
+        self.logged = set()
+
+    @property
+    def count(self):
+        return self.writer.count
+
+    def resume(self):
+        """Keep the orphans logged by an interrupted import and append to them.
+
+        Items logged again because the import reads them a second time are
+        skipped.
+        """
+        self.writer.resume()
+        for filepath in self.writer.files:
+            for item in iter_jsonl(filepath):
+                self.parents[item.get("parent", {}).get("@id")] += 1
+                if item.get("UID"):
+                    self.logged.add(item["UID"])
+        if self.count:
+            logger.info(f"Resuming with {self.count} items without parent")
+
+    def add(self, item):
+        if item.get("UID") in self.logged:
+            return
+        try:
+            self.writer.write(item)
+        except (TypeError, ValueError):
+            logger.exception(f"Could not log {item.get('@id')} without parent")
+            return
+        self.parents[item.get("parent", {}).get("@id")] += 1
+
+    def close(self):
+        self.writer.close()
+
+    def write_summary(self, top=100):
+        """Write <basename>_summary.json and return its path (None without orphans)."""
+        self.close()
+        if not self.count:
+            return None
+        summary = {
+            "count": self.count,
+            "files": self.writer.files,
+            "parents": dict(self.parents.most_common(top)),
+        }
+        filepath = os.path.join(self.directory, f"{self.basename}_summary.json")
+        with open(filepath, "w") as f:
+            json.dump(summary, f, indent=4)
+        return filepath
@@ -0,0 +1,108 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class BlobPrefetcher:
+    """Copy the blobs of the next items to local temp files in worker threads.
+
+    Wrap the items of an import with it. While the importer works on an item,
+    the blobs of the following ``window`` items are resolved and copied into
+    ``directory``, so creating the objects does not wait for slow storage.
+
+    blob_paths(item) returns the blob paths of an item, resolve(blob_path) the
+    absolute path of the exported file (it runs in the worker threads).
+    Use pop(blob_path) to get the local copy, which the caller then owns.
+    """
+
+    def __init__(self, blob_paths, resolve, directory, workers=4, window=50):
+        self.blob_paths = blob_paths
+        self.resolve = resolve
+        self.directory = directory
+        self.workers = workers
+        self.window = window
+        self.futures = {}
+        self.hits = 0
+        self.misses = 0
+        self.waited = 0.0
+
+    def __call__(self, items):
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for item in items:
+                paths = [path for path in self.blob_paths(item) if path]
+                for path in paths:
+                    if path not in self.futures:
+                        self.futures[path] = executor.submit(self.fetch, path)
+                pending.append((item, paths))
+                if len(pending) > self.window:
+                    yield from self.release(pending.popleft())
+            while pending:
+                yield from self.release(pending.popleft())
+        finally:
+            for future in self.futures.values():
+                future.cancel()
+            executor.shutdown(wait=True)
+            for path in list(self.futures):
+                self.discard(path)
+            logger.info(
+                f"Prefetched blobs: {self.hits} used, {self.misses} read directly, "
+                f"waited {self.waited:.1f}s for prefetching"
+            )
+
+    def release(self, entry):
+        item, paths = entry
+        yield item
+        # Copies the importer did not use (e.g. skipped items) are removed
+        for path in paths:
+            self.discard(path)
+
+    def fetch(self, blob_path):
+        source = self.resolve(blob_path)
+        if not source:
+            return None
+        fd, temp_path = tempfile.mkstemp(
+            dir=self.directory, prefix="prefetch-", suffix=".blob"
+        )
+        os.close(fd)
+        shutil.copyfile(source, temp_path)
+        return temp_path
+
+    def pop(self, blob_path):
+        """Return the local copy of blob_path or None if it was not prefetched."""
+        future = self.futures.pop(blob_path, None)
+        if future is None:
+            self.misses += 1
+            return None
+        start = time.perf_counter()
+        try:
+            temp_path = future.result()
+        except Exception:
+            logger.warning(f"Prefetching {blob_path} failed", exc_info=True)
+            temp_path = None
+        self.waited += time.perf_counter() - start
+        if temp_path is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return temp_path
+
+    def discard(self, blob_path):
+        future = self.futures.pop(blob_path, None)
+        if future is None or future.cancelled():
+            return
+        try:
+            temp_path = future.result()
+        except Exception:
+            return
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
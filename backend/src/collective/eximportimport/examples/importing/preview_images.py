@@ -0,0 +1,126 @@
+import json
+import logging
+import os
+import sqlite3
+
+
+logger = logging.getLogger(__name__)
+
+
+class PreviewImageStore:
+    """The preview images of imported items in a sqlite-file.
+
+    global_dict_hook adds the image of an item by its url, global_obj_hook
+    adds the path of the imported object. The entries are written with every
+    commit of the import, so they are still there when the preview images are
+    created by a later run after a restart.
+    """
+
+    def __init__(self, filepath, batch_size=1000):
+        self.filepath = filepath
+        self.batch_size = batch_size
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.filepath)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS preview_images "
+                "(url TEXT PRIMARY KEY, image TEXT, path TEXT)"
+            )
+        return self._db
+
+    def __len__(self):
+        if self._db is None and not os.path.exists(self.filepath):
+            return 0
+        return self.db.execute("SELECT COUNT(*) FROM preview_images").fetchone()[0]
+
+    def add(self, url, image):
+        """Add the image of url, a path recorded for it before is kept."""
+        self.db.execute(
+            "INSERT INTO preview_images (url, image) VALUES (?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET image = excluded.image",
+            (url, json.dumps(image)),
+        )
+
+    def set_path(self, url, path):
+        """Record the path of the imported object, if it has a preview image."""
+        if self._db is None and not os.path.exists(self.filepath):
+            return
+        self.db.execute("UPDATE preview_images SET path = ? WHERE url = ?", (path, url))
+
+    def commit(self):
+        if self._db is not None:
+            self._db.commit()
+
+    def items(self):
+        """Yield (url, image, path) in the order they were added.
+
+        Rows are read in batches, so the store may be written in between.
+        """
+        if self._db is None and not os.path.exists(self.filepath):
+            return
+        last = 0
+        while True:
+            rows = self.db.execute(
+                "SELECT rowid, url, image, path FROM preview_images "
+                "WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, self.batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            for _rowid, url, image, path in rows:
+                yield url, json.loads(image), path
+            last = rows[-1][0]
+
+    def remove(self):
+        """Delete the file once all preview images are created.
+
+        Also used to start a new import without the entries of an earlier one.
+        """
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if os.path.exists(self.filepath):
+            os.remove(self.filepath)
+            logger.info(f"Removed {self.filepath}")
+
+
+class PreviewImageBatches:
+    """Decide when to commit or take a savepoint while creating preview images.
+
+    With commit a commit is due every max_items images or max_bytes of image
+    data, whatever comes first. A savepoint is due every savepoint_items
+    images in between (or all the time without commit).
+    """
+
+    def __init__(
+        self,
+        commit=True,
+        max_items=500,
+        max_bytes=200 * 1024 * 1024,
+        savepoint_items=100,
+    ):
+        self.commit = commit
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.savepoint_items = savepoint_items
+        self.items = 0
+        self.bytes = 0
+        self.commits = 0
+
+    def add(self, size=0):
+        """Count a created image, return "commit", "savepoint" or None."""
+        self.items += 1
+        self.bytes += size or 0
+        if self.commit and (
+            self.items >= self.max_items or self.bytes >= self.max_bytes
+        ):
+            self.items = 0
+            self.bytes = 0
+            self.commits += 1
+            return "commit"
+        if self.savepoint_items and not self.items % self.savepoint_items:
+            return "savepoint"
+        return None
@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_SUFFIX = "_import_progress.json"
+IMPORTED_UIDS_SUFFIX = "_imported_uids.txt"
+
+
+def compact_uid(uid):
+    """Plone UIDs are 32 hex digits, keep them as 16 bytes in memory."""
+    try:
+        return bytes.fromhex(uid)
+    except ValueError:
+        return uid
+
+
+class ImportProgress:
+    """The committed progress of a streamed content import.
+
+    Stores next to the source the UIDs of the imported items (one per line,
+    appended at every commit) and the stream position of the first item that
+    was read but not yet handled. A restarted import continues reading at that
+    position and skips the items whose UID is in the set.
+
+    Positions have to be consumed in increasing order, items may be done in
+    any order (e.g. when they wait for their parent).
+    """
+
+    def __init__(self, source):
+        source = str(source).rstrip(os.sep)
+        self.state_path = source + PROGRESS_SUFFIX
+        self.uids_path = source + IMPORTED_UIDS_SUFFIX
+        self.imported = set()
+        self.pending = []
+        # positions read but not done, in reading order
+        self.outstanding = {}
+        self.last_position = None
+        self.start = None
+
+    def __contains__(self, uid):
+        return bool(uid) and compact_uid(uid) in self.imported
+
+    def __len__(self):
+        return len(self.imported)
+
+    def load(self):
+        """Load the state of an interrupted import and return its position."""
+        if os.path.exists(self.uids_path):
+            with open(self.uids_path) as f:
+                self.imported.update(compact_uid(line.strip()) for line in f if line)
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                position = json.load(f).get("position")
+            self.start = tuple(position) if position else None
+        if self.start or self.imported:
+            logger.info(
+                f"Resuming import at {self.start} skipping {len(self.imported)} "
+                "imported items"
+            )
+        return self.start
+
+    def consumed(self, position):
+        self.outstanding[position] = True
+        self.last_position = position
+
+    def done(self, position):
+        self.outstanding.pop(position, None)
+
+    def add(self, uid):
+        if uid:
+            self.pending.append(uid)
+
+    def position(self):
+        """The position to continue reading at after a restart."""
+        for position in self.outstanding:
+            return position
+        return self.last_position or self.start
+
+    def commit(self):
+        """Persist the state after the transaction was committed."""
+        if self.pending:
+            with open(self.uids_path, "a") as f:
+                f.writelines(f"{uid}\n" for uid in self.pending)
+            self.imported.update(compact_uid(uid) for uid in self.pending)
+            self.pending = []
+        position = self.position()
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"position": position, "imported": len(self.imported)}, f)
+        os.replace(temp_path, self.state_path)
+
+    def clear(self):
+        """Remove the state once the import is complete."""
+        for path in (self.state_path, self.uids_path):
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+import threading
+
+
+class UIDPathResolver:
+    """Resolve UIDs to paths from a bounded map, looking up only misses.
+
+    The content import adds the path of every object it creates. Other UIDs
+    are passed to lookup(uid) (which returns a path or None) and the result is
+    cached. At most maxsize paths are kept, the least recently used go first.
+    """
+
+    def __init__(self, lookup=None, maxsize=200000):
+        self.lookup = lookup
+        self.maxsize = maxsize
+        self.paths = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def add(self, uid, path):
+        with self.lock:
+            self.paths[uid] = path
+            self.paths.move_to_end(uid)
+            if len(self.paths) > self.maxsize:
+                self.paths.popitem(last=False)
+
+    def __call__(self, uid):
+        with self.lock:
+            path = self.paths.get(uid)
+            if path is not None:
+                self.paths.move_to_end(uid)
+                self.hits += 1
+                return path
+            self.misses += 1
+        if self.lookup is None:
+            return None
+        path = self.lookup(uid)
+        if path is not None:
+            # objects found later may still be created, so misses are not cached
+            self.add(uid, path)
+        return path
+
+    def clear(self):
+        with self.lock:
+            self.paths.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return f"{len(self.paths)} paths cached, {self.hits} hits, {self.misses} misses"
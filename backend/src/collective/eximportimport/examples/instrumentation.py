@@ -0,0 +1,162 @@
+"""Timing and throughput of the stages of ExportAll and ImportAll."""
+
+from contextlib import contextmanager
+from datetime import datetime
+
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# seconds between two samples of the RSS during a stage
+RSS_SAMPLE_INTERVAL = 0.1
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (its whole lifetime) in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    if sys.platform == "darwin":
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+def current_rss_mb():
+    """Current resident set size of this process in MB.
+
+    Read from /proc/self/statm, None where that does not exist (macOS).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 1)
+
+
+class PeakRSS:
+    """Sample the current RSS in a thread and keep the maximum.
+
+    ru_maxrss cannot be reset, so the peak of a stage is sampled while it
+    runs. Peaks shorter than the interval can be missed.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="rss-sampler", daemon=True
+        )
+
+    def start(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        rss = current_rss_mb()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+
+    def stop(self):
+        """Stop sampling and return the peak in MB (None without /proc)."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+            self.sample()
+        return self.peak
+
+
+class RunReport:
+    """Collect wall time, CPU time, items, items/s and RSS per stage.
+
+    The RSS of a stage is the current RSS at its start and end, the
+    difference and the peak while it ran (see PeakRSS). The peak of the whole
+    process is reported once per run as process_peak_rss_mb.
+
+    with report.stage("export_relations") as stage:
+        ...
+        stage["items"] = len(relations)
+    report.write(directory)
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = datetime.now()
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, thread=False):
+        """Time a stage.
+
+        Use thread=True for stages running in a worker thread to measure the
+        CPU time of that thread instead of the whole process.
+        """
+        cpu_time = time.thread_time if thread else time.process_time
+        stage = {"name": name, "status": "ok", "items": None}
+        rss_start = current_rss_mb()
+        peak_rss = PeakRSS().start()
+        wall_start = time.perf_counter()
+        cpu_start = cpu_time()
+        try:
+            yield stage
+        except Exception:
+            stage["status"] = "failed"
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            stage["wall_seconds"] = round(wall, 3)
+            stage["cpu_seconds"] = round(cpu_time() - cpu_start, 3)
+            items = stage["items"]
+            if items and wall:
+                stage["items_per_second"] = round(items / wall, 2)
+            else:
+                stage["items_per_second"] = None
+            stage["peak_rss_mb"] = peak_rss.stop()
+            rss_end = current_rss_mb()
+            stage["rss_start_mb"] = rss_start
+            stage["rss_end_mb"] = rss_end
+            if rss_start is not None and rss_end is not None:
+                stage["rss_delta_mb"] = round(rss_end - rss_start, 1)
+            else:
+                stage["rss_delta_mb"] = None
+            self.stages.append(stage)
+            logger.info(
+                f"Stage {name} {stage['status']}: {stage['wall_seconds']}s wall, "
+                f"{stage['cpu_seconds']}s cpu, {items} items, "
+                f"{stage['items_per_second']} items/s, RSS {rss_end} MB "
+                f"({stage['rss_delta_mb']} MB during the stage, peak "
+                f"{stage['peak_rss_mb']} MB)"
+            )
+
+    def skip(self, name):
+        self.stages.append({"name": name, "status": "skipped"})
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "started": self.started.isoformat(),
+            "finished": datetime.now().isoformat(),
+            "process_peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
+
+    def write(self, directory):
+        """Write <name>_report-<timestamp>.json to directory and return its path."""
+        stamp = self.started.strftime("%Y%m%d-%H%M%S")
+        filepath = os.path.join(directory, f"{self.name}_report-{stamp}.json")
+        with open(filepath, "w") as f:
+            json.dump(self.as_dict(), f, indent=4)
+        logger.info(f"Wrote run report to {filepath}")
+        return filepath
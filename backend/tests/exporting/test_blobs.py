@@ -0,0 +1,86 @@
+from collective.eximportimport.examples.exporting.blobs import BlobManifest
+from collective.eximportimport.examples.exporting.jsonl import JsonlWriter
+from collective.eximportimport.examples.importing.import_content import (
+    load_blob_manifest,
+)
+from collective.eximportimport.examples.importing.jsonl import iter_jsonl
+
+import hashlib
+import json
+
+
+class TestBlobManifest:
+    def test_duplicates(self, tmp_path):
+        """Identical files share one manifest entry."""
+        first = tmp_path / "first.blob"
+        second = tmp_path / "second.blob"
+        first.write_bytes(b"%PDF same content")
+        second.write_bytes(b"%PDF same content")
+        manifest = BlobManifest()
+        values = [
+            {"blob_path": "0x01/first.blob", "size": 17, "content-type": "a/pdf"},
+            {"blob_path": "0x02/second.blob", "size": 17, "content-type": "a/pdf"},
+        ]
+        digests = [
+            manifest.add(values[0], first),
+            manifest.add(values[1], second),
+        ]
+        assert digests[0] == digests[1]
+        assert digests[0] == hashlib.sha256(b"%PDF same content").hexdigest()
+        assert manifest.references == 2
+        assert manifest.duplicate_bytes == 17
+
+        manifest.write(tmp_path / "Plone_blob_manifest.json")
+        data = json.loads((tmp_path / "Plone_blob_manifest.json").read_text())
+        assert data == {
+            digests[0]: {
+                "blob_path": "0x01/first.blob",
+                "size": 17,
+                "content-type": "a/pdf",
+            }
+        }
+
+    def test_resume(self, tmp_path):
+        """A resumed export keeps the blobs of the items written before."""
+
+        def export_item(manifest, writer, name):
+            blob = tmp_path / f"{name}.blob"
+            blob.write_bytes(name.encode())
+            value = {"blob_path": f"0x01/{name}.blob", "size": len(name)}
+            digest = manifest.add(value, blob)
+            writer.write({"@id": name, "file": {"blob_digest": digest}})
+
+        manifest_path = str(tmp_path / "Plone_blob_manifest.json")
+        manifest = BlobManifest()
+        manifest.open_journal(manifest_path)
+        with JsonlWriter(str(tmp_path), "Plone") as writer:
+            export_item(manifest, writer, "first")
+            export_item(manifest, writer, "second")
+        # interrupted: the manifest was never written
+
+        manifest = BlobManifest()
+        manifest.open_journal(manifest_path, resume=True)
+        with JsonlWriter(str(tmp_path), "Plone") as writer:
+            assert writer.resume()["@id"] == "second"
+            export_item(manifest, writer, "third")
+        manifest.write(manifest_path)
+        assert not (tmp_path / "Plone_blob_manifest.journal").exists()
+
+        blobs = load_blob_manifest(str(tmp_path / "Plone.jsonl"))
+        items = list(iter_jsonl(tmp_path / "Plone.jsonl"))
+        assert [item["@id"] for item in items] == ["first", "second", "third"]
+        for item in items:
+            assert blobs[item["file"]["blob_digest"]]["blob_path"].endswith(
+                f"/{item['@id']}.blob"
+            )
+
+    def test_fresh_export_discards_journal(self, tmp_path):
+        """Without resume the journal of an earlier export is not used."""
+        (tmp_path / "Plone_blob_manifest.journal").write_text(
+            '{"digest": "stale", "blob_path": "0x01/stale.blob"}\n'
+        )
+        manifest = BlobManifest()
+        manifest.open_journal(str(tmp_path / "Plone_blob_manifest.json"))
+        assert manifest.blobs == {}
+        manifest.write(str(tmp_path / "Plone_blob_manifest.json"))
+        assert json.loads((tmp_path / "Plone_blob_manifest.json").read_text()) == {}
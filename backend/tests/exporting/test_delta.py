@@ -0,0 +1,114 @@
+from collective.eximportimport.examples.exporting.delta import catalog_paths
+from collective.eximportimport.examples.exporting.delta import DeltaState
+from collective.eximportimport.examples.exporting.export_content import (
+    CustomExportContent,
+)
+from DateTime import DateTime
+from plone import api
+
+import json
+import pytest
+
+
+class TestDeltaState:
+    def test_roundtrip(self, tmp_path):
+        """The watermark and paths of the last run are read back."""
+        state = DeltaState(tmp_path, "Plone")
+        assert not state.load()
+        state.save("2026-10-01T00:00:00+00:00", {"uid-1": "/Plone/a"})
+        assert (tmp_path / "Plone_delta_state.json").exists()
+
+        state = DeltaState(tmp_path, "Plone")
+        assert state.load()
+        assert state.watermark == "2026-10-01T00:00:00+00:00"
+        assert state.paths == {"uid-1": "/Plone/a"}
+
+
+@pytest.fixture
+def site(portal):
+    """Documents last modified a day ago."""
+    with api.env.adopt_roles(["Manager"]):
+        for id_ in ("unchanged", "changed", "deleted", "moved"):
+            doc = api.content.create(container=portal, type="Document", id=id_)
+            doc.setModificationDate(DateTime() - 1)
+            doc.reindexObject(idxs=["modified"])
+    return portal
+
+
+@pytest.fixture
+def query(site):
+    """The query of an export of the documents of the site."""
+    return {
+        "portal_type": ["Document"],
+        "path": {"query": "/".join(site.getPhysicalPath()), "depth": -1},
+    }
+
+
+def save_state(directory, query):
+    """Record an export of the site twelve hours ago."""
+    state = DeltaState(directory, "Document")
+    state.save((DateTime() - 0.5).ISO8601(), catalog_paths(query))
+    return state
+
+
+def change_content(portal):
+    """Modify, add, delete and move documents, return {id: UID} of all of them."""
+    uids = {doc.getId(): doc.UID() for doc in portal.contentValues()}
+    with api.env.adopt_roles(["Manager"]):
+        changed = portal["changed"]
+        changed.setModificationDate(DateTime())
+        changed.reindexObject(idxs=["modified"])
+        added = api.content.create(container=portal, type="Document", id="added")
+        uids["added"] = added.UID()
+        api.content.delete(portal["deleted"], check_linkintegrity=False)
+        api.content.rename(portal["moved"], new_id="renamed")
+    return uids
+
+
+class TestDelta:
+    def test_changes(self, site, query, tmp_path):
+        """Modified, new and moved items are exported, deleted ones tombstoned."""
+        state = save_state(tmp_path, query)
+        uids = change_content(site)
+        portal_path = "/".join(site.getPhysicalPath())
+
+        changed, tombstones = state.changes(query, catalog_paths(query))
+        assert changed == {uids["changed"], uids["added"], uids["moved"]}
+        assert tombstones == {
+            "since": state.watermark,
+            "deleted": [{"UID": uids["deleted"], "path": f"{portal_path}/deleted"}],
+            "moved": [
+                {
+                    "UID": uids["moved"],
+                    "from": f"{portal_path}/moved",
+                    "to": f"{portal_path}/renamed",
+                }
+            ],
+        }
+
+    def test_prepare_delta(self, site, query, tmp_path, http_request):
+        """The export query of a delta only matches the changed items."""
+        save_state(tmp_path, query)
+        uids = change_content(site)
+        view = CustomExportContent(site, http_request)
+        view.portal_type = ["Document"]
+        view.path = "/".join(site.getPhysicalPath())
+        view.depth = -1
+
+        basename = view.prepare_delta("Document", tmp_path)
+        assert basename == f"Document-delta-{view.delta_stamp}"
+        tombstones = json.loads((tmp_path / f"{basename}_tombstones.json").read_text())
+        assert [item["UID"] for item in tombstones["deleted"]] == [uids["deleted"]]
+        brains = api.content.find(**view.build_query())
+        assert {brain.getId for brain in brains} == {"changed", "added", "renamed"}
+
+    def test_first_run(self, site, tmp_path, http_request):
+        """Without the state of an earlier run everything is exported."""
+        view = CustomExportContent(site, http_request)
+        view.portal_type = ["Document"]
+        view.path = "/".join(site.getPhysicalPath())
+        view.depth = -1
+
+        assert view.prepare_delta("Document", tmp_path) == "Document"
+        assert view.delta_uids is None
+        assert len(api.content.find(**view.build_query())) == 4
@@ -0,0 +1,92 @@
+from collective.eximportimport.examples.exporting.export_all import remove_shard_files
+from collective.eximportimport.examples.exporting.export_all import split_into_shards
+from collective.eximportimport.examples.exporting.export_all import (
+    write_shard_manifest,
+)
+from plone import api
+
+import json
+import pytest
+
+
+class FakeProcess:
+    def __init__(self, returncode):
+        self.returncode = returncode
+
+    def wait(self):
+        return self.returncode
+
+
+def write_status(directory, name, count):
+    files = [f"{name}.jsonl"]
+    (directory / f"{name}.status.json").write_text(
+        json.dumps({"name": name, "paths": [], "files": files, "count": count})
+    )
+
+
+class TestShardManifest:
+    def test_manifest(self, tmp_path):
+        """The files of all shards are listed in order."""
+        write_status(tmp_path, "shard-00", 1)
+        write_status(tmp_path, "shard-01", 5)
+        processes = [
+            ("shard-00", ["/Plone"], FakeProcess(0)),
+            ("shard-01", ["/Plone/a"], FakeProcess(0)),
+        ]
+        assert write_shard_manifest(str(tmp_path), "/Plone", processes) == 6
+        manifest = json.loads((tmp_path / "manifest.json").read_text())
+        assert manifest["files"] == ["shard-00.jsonl", "shard-01.jsonl"]
+
+    def test_failed_shard(self, tmp_path):
+        """A failed shard raises after the manifest is written."""
+        write_status(tmp_path, "shard-00", 1)
+        processes = [
+            ("shard-00", ["/Plone"], FakeProcess(0)),
+            ("shard-01", ["/Plone/a"], FakeProcess(1)),
+        ]
+        with pytest.raises(RuntimeError, match="shard-01"):
+            write_shard_manifest(str(tmp_path), "/Plone", processes)
+        manifest = json.loads((tmp_path / "manifest.json").read_text())
+        assert [shard["returncode"] for shard in manifest["shards"]] == [0, 1]
+
+    def test_remove_shard_files(self, tmp_path):
+        """Only the files of a sharded export are removed."""
+        for name in ("manifest.json", "shard-01.jsonl", "shard-01.status.json"):
+            (tmp_path / name).write_text("{}")
+        (tmp_path / "Plone-00001.jsonl").write_text("{}")
+        remove_shard_files(str(tmp_path))
+        assert [path.name for path in tmp_path.iterdir()] == ["Plone-00001.jsonl"]
+
+
+@pytest.fixture
+def site(portal):
+    """A site with subtrees of 4, 2 and 1 objects."""
+    # plone.volto disables Folders, enable them like ImportAll does
+    portal.portal_types["Folder"].global_allow = True
+    with api.env.adopt_roles(["Manager"]):
+        big = api.content.create(container=portal, type="Folder", id="big")
+        for number in range(3):
+            api.content.create(container=big, type="Document", id=f"doc-{number}")
+        mid = api.content.create(container=portal, type="Folder", id="mid")
+        api.content.create(container=mid, type="Document", id="doc")
+        api.content.create(container=portal, type="Document", id="small")
+    return portal
+
+
+class TestSplitIntoShards:
+    def test_balanced(self, site):
+        """The biggest subtree goes into the currently smallest shard."""
+        portal_path = "/".join(site.getPhysicalPath())
+        assert split_into_shards(portal_path, 2) == [
+            [f"{portal_path}/big"],
+            [f"{portal_path}/mid", f"{portal_path}/small"],
+        ]
+
+    def test_empty_shards(self, site):
+        """Shards without items are left out."""
+        portal_path = "/".join(site.getPhysicalPath())
+        assert split_into_shards(portal_path, 5) == [
+            [f"{portal_path}/big"],
+            [f"{portal_path}/mid"],
+            [f"{portal_path}/small"],
+        ]
@@ -0,0 +1,33 @@
+from AccessControl import getSecurityManager
+from collective.eximportimport.examples.exporting.export_shard import login
+from collective.eximportimport.examples.exporting.export_shard import parse_args
+from plone.app.testing import SITE_OWNER_NAME
+from plone.app.testing import TEST_USER_ID
+
+import pytest
+
+
+class TestExportShard:
+    def test_parse_args(self):
+        """The shard runs as the given user."""
+        args = parse_args([
+            "--name=shard-01",
+            "--output-dir=/var",
+            "--path=/Plone/a",
+            "--portal-type=Document",
+            "--user=editor",
+        ])
+        assert args.user == "editor"
+
+    def test_login(self, portal):
+        """Users are found in the site and in the Zope root."""
+        app = portal.getPhysicalRoot()
+        login(portal, app, TEST_USER_ID)
+        assert getSecurityManager().getUser().getId() == TEST_USER_ID
+        login(portal, app, SITE_OWNER_NAME)
+        assert getSecurityManager().getUser().getId() == SITE_OWNER_NAME
+
+    def test_missing_user(self, portal):
+        """A missing user is a clear error."""
+        with pytest.raises(ValueError, match="User unknown not found"):
+            login(portal, portal.getPhysicalRoot(), "unknown")
@@ -0,0 +1,89 @@
+from collective.eximportimport.examples.exporting.export_content import (
+    CustomExportContent,
+)
+from plone import api
+from zope.annotation.interfaces import IAnnotations
+from zope.component import getSiteManager
+from zope.interface import Interface
+
+import pytest
+
+
+class TileView:
+    def __init__(self, context, request):
+        self.context = context
+        self.request = request
+
+
+@pytest.fixture
+def tile_view():
+    """A view registered as test.tile for all objects."""
+    site_manager = getSiteManager()
+    site_manager.registerAdapter(
+        TileView, (Interface, Interface), Interface, "test.tile"
+    )
+    yield TileView
+    site_manager.unregisterAdapter(
+        TileView, (Interface, Interface), Interface, "test.tile"
+    )
+
+
+@pytest.fixture
+def export(portal, http_request):
+    """The content export with the caches of an export that started."""
+    view = CustomExportContent(portal, http_request)
+    view.start()
+    return view
+
+
+@pytest.fixture
+def document(portal):
+    """A document in the portal."""
+    with api.env.adopt_roles(["Manager"]):
+        return api.content.create(container=portal, type="Document", id="doc")
+
+
+class TestGetTileView:
+    def test_cached(self, export, document, tile_view):
+        """The view factory of a tile name is looked up once."""
+        view = export.get_tile_view(document, "test.tile")
+        assert isinstance(view, TileView)
+        assert view.context is document
+        # the cached factory is used even after the view is gone
+        getSiteManager().unregisterAdapter(
+            TileView, (Interface, Interface), Interface, "test.tile"
+        )
+        assert isinstance(export.get_tile_view(document, "test.tile"), TileView)
+        assert export.tile_stats["view_misses"] == 1
+        assert export.tile_stats["view_hits"] == 1
+
+    def test_missing(self, export, document):
+        """Tiles without a view are cached as missing."""
+        assert export.get_tile_view(document, "missing.tile") is None
+        assert export.get_tile_view(document, "missing.tile") is None
+        assert list(export.tile_view_factories.values()) == [None]
+        assert export.tile_stats["view_misses"] == 1
+        assert export.tile_stats["view_hits"] == 1
+
+
+class TestTileAnnotations:
+    def test_referenced_tiles(self, export, document):
+        """Reading the referenced keys gives the same data as a full scan."""
+        annotations = IAnnotations(document)
+        annotations["plone.tiles.data.a"] = {"text": "A"}
+        annotations["plone.tiles.data.b"] = {"title": "B", "_plone.sacles": {}}
+        annotations["other.key"] = {"x": 1}
+        tile_refs = [
+            "./@@plone.app.standardtiles.html/a",
+            "./@@my.custom.list.tile/b?title=B",
+            "./@@plone.app.standardtiles.field?field=title",
+            "./@@plone.app.standardtiles.html/a",
+        ]
+        scanned = export.tile_annotations(document)
+        assert export.tile_annotations(document, tile_refs) == scanned
+        assert scanned == {
+            "plone.tiles.data.a": {"text": "A"},
+            "plone.tiles.data.b": {"title": "B"},
+        }
+        assert export.tile_stats["annotation_scans"] == 1
+        assert export.tile_stats["annotation_lookups"] == 2
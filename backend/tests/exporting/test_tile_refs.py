@@ -0,0 +1,65 @@
+from collective.eximportimport.examples.exporting.export_content import (
+    extract_tile_refs,
+)
+
+
+class TestExtractTileRefs:
+    def test_no_tiles(self):
+        """Layouts without tiles return no references."""
+        assert extract_tile_refs("") == []
+        assert extract_tile_refs('<div class="mosaic-grid-row"></div>') == []
+
+    def test_order_and_entities(self):
+        """References are returned in document order with entities unescaped."""
+        layout = (
+            '<div data-panel="content">'
+            '<div data-tile="./@@plone.app.standardtiles.html/a?x=1&amp;y=2"></div>'
+            "<div class='tile' data-tile='./@@plone.app.standardtiles.field/b'/>"
+            "</div>"
+        )
+        assert extract_tile_refs(layout) == [
+            "./@@plone.app.standardtiles.html/a?x=1&y=2",
+            "./@@plone.app.standardtiles.field/b",
+        ]
+
+    def test_ignored_markup(self):
+        """Comments and other elements with data-tile are skipped."""
+        layout = (
+            '<!-- <div data-tile="./@@commented/a"></div> -->'
+            '<span data-tile="./@@span/b"></span>'
+            '<DIV DATA-TILE="./@@upper/c"></DIV>'
+        )
+        assert extract_tile_refs(layout) == ["./@@upper/c"]
+
+    def test_raw_text(self):
+        """Divs in the text of script and style elements are skipped."""
+        layout = (
+            "<script>var tile = '<div data-tile=\"./@@script/a\"></div>';</script>"
+            '<STYLE type="text/css">/* <div data-tile="./@@style/b"> */</STYLE>'
+            '<div data-tile="./@@after/c"></div>'
+        )
+        assert extract_tile_refs(layout) == ["./@@after/c"]
+
+    def test_attribute_values(self):
+        """Divs in the attribute values of other tags are skipped."""
+        layout = (
+            "<p title=\"<div data-tile='./@@title/a'>\">Text</p>"
+            '<div data-tile="./@@after/b"></div>'
+        )
+        assert extract_tile_refs(layout) == ["./@@after/b"]
+
+    def test_cdata(self):
+        """Divs in CDATA sections are skipped."""
+        layout = (
+            '<![CDATA[<div data-tile="./@@cdata/a"></div>]]>'
+            '<div data-tile="./@@after/b"></div>'
+        )
+        assert extract_tile_refs(layout) == ["./@@after/b"]
+
+    def test_unterminated_comment(self):
+        """Only terminated comments are skipped, a stray "<!--" hides no tiles."""
+        layout = (
+            '<div data-tile="./@@before/a"></div>'
+            '<!-- <div data-tile="./@@after/b"></div>'
+        )
+        assert extract_tile_refs(layout) == ["./@@before/a", "./@@after/b"]
@@ -0,0 +1,34 @@
+from collective.eximportimport.examples.importing.batches import walk_content
+from OFS.Folder import Folder
+
+
+def make_tree():
+    root = Folder("root")
+    for folder_id in ("b", "a-b", "a"):
+        root._setObject(folder_id, Folder(folder_id))
+    for child_id in ("y", "x"):
+        root.a._setObject(child_id, Folder(child_id))
+    return root
+
+
+class TestWalkContent:
+    def test_path_order(self):
+        """Objects are yielded depth first with increasing paths."""
+        paths = [path for path, _obj in walk_content(make_tree())]
+        assert paths == [
+            ("root",),
+            ("root", "a"),
+            ("root", "a", "x"),
+            ("root", "a", "y"),
+            ("root", "a-b"),
+            ("root", "b"),
+        ]
+        assert paths == sorted(paths)
+
+    def test_after(self):
+        """Resuming skips everything up to and including the given path."""
+        root = make_tree()
+        paths = [path for path, _obj in walk_content(root, ("root", "a", "x"))]
+        assert paths == [("root", "a", "y"), ("root", "a-b"), ("root", "b")]
+        paths = [path for path, _obj in walk_content(root, ("root", "a-b"))]
+        assert paths == [("root", "b")]
@@ -0,0 +1,100 @@
+from collective.eximportimport.examples.importing.commit_policy import CommitPolicy
+from persistent.mapping import PersistentMapping
+from ZODB.DB import DB
+from ZODB.MappingStorage import MappingStorage
+
+
+class FakeObject:
+    def __init__(self, size):
+        self._p_estimated_size = size
+
+
+class FakeConnection:
+    def __init__(self):
+        self._registered_objects = []
+
+
+class FakeSavepointStorage:
+    def __init__(self, objects, position):
+        self.index = dict.fromkeys(range(objects))
+        self.position = position
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCommitPolicy:
+    def test_items(self):
+        """Without a connection only items, blob bytes and time count."""
+        policy = CommitPolicy(max_items=2)
+        policy.add()
+        assert policy.due() is None
+        policy.add()
+        assert policy.due() == "items"
+        policy.committed("items")
+        assert policy.due() is None
+        assert policy.commits == 1
+
+    def test_changed_objects(self):
+        """Registered and saved objects and their size are counted once."""
+        connection = FakeConnection()
+        policy = CommitPolicy(connection, max_items=None, max_bytes=1000)
+        policy.add()
+        connection._registered_objects += [FakeObject(400), FakeObject(500)]
+        assert policy.due() is None
+        assert policy.changed_objects() == (2, 900)
+        connection._registered_objects.append(FakeObject(200))
+        assert policy.due() == "bytes"
+        # a savepoint stores the registered objects and empties the list
+        connection._savepoint_storage = FakeSavepointStorage(3, 1200)
+        connection._registered_objects = [FakeObject(100)]
+        assert policy.changed_objects() == (4, 1300)
+
+    def test_blob_bytes_and_seconds(self):
+        """Blob bytes and elapsed time are budgets as well."""
+        clock = FakeClock()
+        policy = CommitPolicy(max_items=None, max_blob_bytes=100, clock=clock)
+        policy.add(blob_bytes=150)
+        assert policy.due() == "blob_bytes"
+        policy.committed("blob_bytes")
+        policy.add()
+        clock.now = 121
+        assert policy.due() == "seconds"
+
+    def test_nothing_to_commit(self):
+        """No commit is due before an item was added."""
+        clock = FakeClock()
+        policy = CommitPolicy(clock=clock)
+        clock.now = 1000
+        assert policy.due() is None
+
+    def test_new_objects(self):
+        """New objects count once a savepoint stored them."""
+        db = DB(MappingStorage())
+        connection = db.open()
+        root = connection.root()
+        policy = CommitPolicy(
+            connection,
+            max_items=None,
+            max_objects=None,
+            max_bytes=100 * 1000,
+            savepoint_items=5,
+        )
+        try:
+            reasons = []
+            for i in range(15):
+                root[i] = PersistentMapping({"text": "x" * 10000})
+                policy.add()
+                reasons.append(policy.due())
+            assert reasons[:5] == [None] * 5
+            assert "bytes" in reasons
+            assert policy.objects > 10
+        finally:
+            connection.transaction_manager.abort()
+            connection.close()
+            db.close()
@@ -0,0 +1,45 @@
+from collective.eximportimport.examples.importing.deferred import ParentQueue
+
+
+def make_item(path, parent_uid):
+    return {"@id": f"http://localhost:8080{path}", "parent": {"UID": parent_uid}}
+
+
+class TestParentQueue:
+    def test_release(self):
+        """Items are released by the UID of their parent in insertion order."""
+        queue = ParentQueue(None)
+        first = make_item("/Plone/a/one", "uid-a")
+        second = make_item("/Plone/a/two", "uid-a")
+        other = make_item("/Plone/b/one", "uid-b")
+        for item in (first, other, second):
+            queue.defer(item["parent"]["UID"], item)
+        assert len(queue) == 3
+        assert queue.release("uid-a") == [first, second]
+        assert queue.release("uid-a") == []
+        assert len(queue) == 1
+
+    def test_spill_to_disk(self, tmp_path):
+        """Items over max_in_memory are stored in a sqlite-file until close."""
+        queue = ParentQueue(tmp_path, max_in_memory=1)
+        items = [make_item(f"/Plone/a/doc-{i}", "uid-a") for i in range(3)]
+        for item in items:
+            queue.defer("uid-a", item)
+        assert queue.spilled == 2
+        assert len(list(tmp_path.glob("*.sqlite"))) == 1
+        assert queue.release("uid-a") == items
+        assert len(queue) == 0
+        queue.close()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_remaining_parents_first(self, tmp_path):
+        """Items still waiting at the end are returned ordered by depth."""
+        queue = ParentQueue(tmp_path, max_in_memory=2)
+        deep = make_item("/Plone/a/b/c", "uid-b")
+        middle = make_item("/Plone/a/b", "uid-a")
+        spilled_deep = make_item("/Plone/x/y/z", "uid-y")
+        spilled_top = make_item("/Plone/x", "uid-plone")
+        for item in (deep, middle, spilled_deep, spilled_top):
+            queue.defer(item["parent"]["UID"], item)
+        assert list(queue.remaining()) == [spilled_top, middle, deep, spilled_deep]
+        queue.close()
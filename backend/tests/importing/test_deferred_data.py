@@ -0,0 +1,52 @@
+from collective.eximportimport.examples.importing.deferred_data import (
+    iter_with_deferred_data,
+)
+from collective.eximportimport.examples.importing.deferred_data import (
+    SqliteDeferredDataStore,
+)
+
+
+class Brain:
+    def __init__(self, uid):
+        self.UID = uid
+
+
+class TestSqliteDeferredDataStore:
+    def test_set_and_get(self, tmp_path):
+        """Data is stored by UID and survives closing the store."""
+        filepath = str(tmp_path / "deferred.sqlite")
+        store = SqliteDeferredDataStore(filepath)
+        store.set("uid-1", {"_tile_data": [["text__1", {"text": "<p>1</p>"}]]})
+        store.close()
+        store = SqliteDeferredDataStore(filepath)
+        assert store.get("uid-1") == {"_tile_data": [["text__1", {"text": "<p>1</p>"}]]}
+        assert store.get("uid-2") == {}
+
+    def test_bulk_read(self, tmp_path):
+        """Brains are yielded in order with the data read in batches."""
+        store = SqliteDeferredDataStore(str(tmp_path / "deferred.sqlite"))
+        for i in range(0, 5, 2):
+            store.set(f"uid-{i}", {"_form_data": {"index": i}})
+        brains = [Brain(f"uid-{i}") for i in range(5)]
+        result = list(iter_with_deferred_data(store, brains, batch_size=2))
+        assert [brain for brain, _data in result] == brains
+        assert [data for _brain, data in result] == [
+            {"_form_data": {"index": 0}},
+            {},
+            {"_form_data": {"index": 2}},
+            {},
+            {"_form_data": {"index": 4}},
+        ]
+
+    def test_delete(self, tmp_path):
+        """The data of an earlier import is removed."""
+        store = SqliteDeferredDataStore(str(tmp_path / "deferred.sqlite"))
+        store.set("uid-1", {"_form_data": {}})
+        store.set("uid-2", {"_form_data": {}})
+        store.delete("uid-1")
+        store.delete("uid-3")
+        assert store.get("uid-1") == {}
+        assert store.get_many(["uid-1", "uid-2"]) == {
+            "uid-1": {},
+            "uid-2": {"_form_data": {}},
+        }
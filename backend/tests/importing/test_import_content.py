@@ -0,0 +1,53 @@
+from collective.eximportimport.examples.importing.import_content import (
+    CustomImportContent,
+)
+from collective.eximportimport.examples.importing.import_content import is_contained
+from collective.eximportimport.examples.importing.import_content import (
+    STREAM_POSITION_KEY,
+)
+from collective.eximportimport.examples.importing.progress import ImportProgress
+from OFS.Folder import Folder
+from types import SimpleNamespace
+
+
+def make_site():
+    site = Folder("Plone")
+    for folder_id in ("a", "b"):
+        site._setObject(folder_id, Folder(folder_id))
+    return site
+
+
+class TestIsContained:
+    def test_contained(self):
+        """An object is contained until it is removed or replaced."""
+        site = make_site()
+        a = site["a"]
+        b = site["b"]
+        assert is_contained(a)
+        site._delObject("a")
+        assert not is_contained(a)
+        site._delObject("b")
+        site._setObject("b", Folder("b"))
+        assert not is_contained(b)
+        assert is_contained(site["b"])
+
+
+class TestMarkDone:
+    def test_failed_item_not_recorded(self, tmp_path):
+        """Only items whose object survived their handling are recorded."""
+        site = make_site()
+        progress = ImportProgress(tmp_path / "Plone.jsonl")
+        view = SimpleNamespace(progress=progress, handled_object=None)
+        items = []
+        for index, uid in enumerate(["a", "b"]):
+            progress.consumed((0, index))
+            items.append({"UID": uid, STREAM_POSITION_KEY: (0, index)})
+
+        for item in CustomImportContent.mark_done(view, iter(items)):
+            # global_obj_hook, then a later step fails and removes "b"
+            view.handled_object = (item["UID"], site[item["UID"]])
+            if item["UID"] == "b":
+                site._delObject("b")
+
+        assert progress.pending == ["a"]
+        assert progress.outstanding == {}
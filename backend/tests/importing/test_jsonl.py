@@ -0,0 +1,81 @@
+from collective.eximportimport.examples.exporting.jsonl import JsonlWriter
+from collective.eximportimport.examples.importing.jsonl import iter_jsonl
+from collective.eximportimport.examples.importing.jsonl import iter_jsonl_positions
+from collective.eximportimport.examples.importing.jsonl import jsonl_files
+
+
+class TestJsonl:
+    def test_roundtrip(self, tmp_path):
+        """Items written by JsonlWriter are read back in order."""
+        items = [
+            {"@id": f"http://nohost/plone/item-{i}", "UID": str(i)} for i in range(5)
+        ]
+        with JsonlWriter(tmp_path, "Plone") as writer:
+            for item in items:
+                writer.write(item)
+        assert writer.count == 5
+        assert list(iter_jsonl(tmp_path / "Plone.jsonl")) == items
+
+    def test_chunks(self, tmp_path):
+        """A directory of chunk files is read in order."""
+        items = [{"UID": str(i)} for i in range(5)]
+        with JsonlWriter(tmp_path, "Plone", chunk_size=2) as writer:
+            for item in items:
+                writer.write(item)
+        assert [path.name for path in jsonl_files(tmp_path)] == [
+            "Plone-00001.jsonl",
+            "Plone-00002.jsonl",
+            "Plone-00003.jsonl",
+        ]
+        assert list(iter_jsonl(tmp_path)) == items
+
+    def test_truncated_last_line(self, tmp_path):
+        """An interrupted export is usable up to the last complete line."""
+        path = tmp_path / "Plone.jsonl"
+        path.write_text('{"UID": "1"}\n{"UID": "2"}\n{"UID": ')
+        assert list(iter_jsonl(path)) == [{"UID": "1"}, {"UID": "2"}]
+
+    def test_resume(self, tmp_path):
+        """An interrupted export continues after the last complete item."""
+        with JsonlWriter(tmp_path, "Plone", chunk_size=2) as writer:
+            for i in range(3):
+                writer.write({"UID": str(i)})
+        last_file = tmp_path / "Plone-00002.jsonl"
+        last_file.write_text(last_file.read_text() + '{"UID": "3", "tit')
+
+        with JsonlWriter(tmp_path, "Plone", chunk_size=2) as writer:
+            assert writer.resume() == {"UID": "2"}
+            assert writer.count == 3
+            writer.write({"UID": "3"})
+            writer.write({"UID": "4"})
+        assert list(iter_jsonl(tmp_path)) == [{"UID": str(i)} for i in range(5)]
+
+    def test_start_position(self, tmp_path):
+        """Reading continues at the position of an item in any chunk file."""
+        items = [{"UID": str(i)} for i in range(5)]
+        with JsonlWriter(tmp_path, "Plone", chunk_size=2) as writer:
+            for item in items:
+                writer.write(item)
+        positions = [position for position, _item in iter_jsonl_positions(tmp_path)]
+        assert positions[0] == (0, 0)
+        assert positions[2] == (1, 0)
+        for index, position in enumerate(positions):
+            resumed = iter_jsonl_positions(tmp_path, position)
+            assert [item for _position, item in resumed] == items[index:]
+
+    def test_clear(self, tmp_path):
+        """A new export does not leave chunks of a larger earlier export."""
+        with JsonlWriter(tmp_path, "Plone", chunk_size=1) as writer:
+            for i in range(3):
+                writer.write({"UID": str(i)})
+        (tmp_path / "Plone.jsonl").write_text('{"UID": "old"}\n')
+        (tmp_path / "Plone-delta-20260101-000000.jsonl").write_text("{}\n")
+
+        with JsonlWriter(tmp_path, "Plone", chunk_size=1) as writer:
+            writer.clear()
+            writer.write({"UID": "new"})
+        assert list(iter_jsonl(tmp_path / "Plone-00001.jsonl")) == [{"UID": "new"}]
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "Plone-00001.jsonl",
+            "Plone-delta-20260101-000000.jsonl",
+        ]
@@ -0,0 +1,67 @@
+from collective.eximportimport.examples.importing import linkintegrity
+from collective.eximportimport.examples.importing.linkintegrity import link_fields
+from collective.eximportimport.examples.importing.linkintegrity import (
+    update_link_integrity,
+)
+from plone import api
+
+import pytest
+import transaction
+
+
+@pytest.fixture
+def site(functional):
+    """A site with a document linking to another one, which has no links."""
+    portal = functional["portal"]
+    # plone.volto disables Folders, enable them like ImportAll does
+    portal.portal_types["Folder"].global_allow = True
+    with api.env.adopt_roles(["Manager"]):
+        target = api.content.create(container=portal, type="Document", id="target")
+        linked = api.content.create(container=portal, type="Document", id="linked")
+        folder = api.content.create(container=portal, type="Folder", id="folder")
+    target.blocks = {}
+    linked.blocks = {
+        "block-1": {
+            "@type": "slate",
+            "value": [
+                {
+                    "type": "link",
+                    "data": {"url": f"../resolveuid/{target.UID()}"},
+                    "children": [{"text": "Target"}],
+                }
+            ],
+        }
+    }
+    folder.blocks = {}
+    transaction.commit()
+    return portal
+
+
+@pytest.fixture
+def updated(monkeypatch):
+    """Ids of the objects whose link integrity references were updated."""
+    ids = []
+    monkeypatch.setattr(
+        linkintegrity, "modifiedContent", lambda obj, event: ids.append(obj.getId())
+    )
+    return ids
+
+
+class TestUpdateLinkIntegrity:
+    def test_link_fields(self, site):
+        """Documents have blocks, unknown types no fields."""
+        assert link_fields("Document")[1] is True
+        assert link_fields("Unknown") == ([], False)
+
+    def test_only_with_links(self, site, updated, tmp_path):
+        """Only objects with rich text containing links or blocks are updated."""
+        state_path = str(tmp_path / "state.json")
+        assert update_link_integrity(site, state_path, batch_size=1) == 1
+        assert updated == ["linked"]
+
+    def test_all(self, site, updated, tmp_path):
+        """Without only_with_links all content is updated."""
+        state_path = str(tmp_path / "state.json")
+        count = update_link_integrity(site, state_path, only_with_links=False)
+        assert {"folder", "linked", "target"} <= set(updated)
+        assert count == len(updated)
@@ -0,0 +1,44 @@
+from collective.eximportimport.examples.importing.jsonl import iter_jsonl
+from collective.eximportimport.examples.importing.orphans import OrphanLog
+
+import json
+
+
+class TestOrphanLog:
+    def test_log_and_summary(self, tmp_path):
+        """Orphans are appended to a jsonl-file, the summary counts parents."""
+        orphans = OrphanLog(tmp_path)
+        assert orphans.write_summary() is None
+        items = [
+            {"@id": f"/Plone/missing/doc-{i}", "parent": {"@id": "/Plone/missing"}}
+            for i in range(3)
+        ]
+        for item in items:
+            orphans.add(item)
+        filepath = orphans.write_summary()
+        with open(filepath) as f:
+            summary = json.load(f)
+        assert summary["count"] == 3
+        assert summary["parents"] == {"/Plone/missing": 3}
+        assert list(iter_jsonl(tmp_path / "content_without_parent.jsonl")) == items
+
+    def test_resume(self, tmp_path):
+        """A resumed import appends to the orphans of the interrupted one."""
+        orphans = OrphanLog(tmp_path)
+        first = {"@id": "/Plone/x/a", "UID": "a", "parent": {"@id": "/Plone/x"}}
+        orphans.add(first)
+        orphans.close()
+
+        orphans = OrphanLog(tmp_path)
+        orphans.resume()
+        second = {"@id": "/Plone/y/b", "UID": "b", "parent": {"@id": "/Plone/y"}}
+        # read again because it was logged after the last commit
+        orphans.add(first)
+        orphans.add(second)
+        filepath = orphans.write_summary()
+        with open(filepath) as f:
+            summary = json.load(f)
+        assert summary["count"] == 2
+        assert summary["parents"] == {"/Plone/x": 1, "/Plone/y": 1}
+        path = tmp_path / "content_without_parent.jsonl"
+        assert list(iter_jsonl(path)) == [first, second]
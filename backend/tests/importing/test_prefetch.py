@@ -0,0 +1,35 @@
+from collective.eximportimport.examples.importing.prefetch import BlobPrefetcher
+
+import os
+
+
+class TestBlobPrefetcher:
+    def test_prefetch(self, tmp_path):
+        """Blobs of upcoming items are copied, unused copies are removed."""
+        source = tmp_path / "blobstorage"
+        source.mkdir()
+        for name in ("a", "b", "c"):
+            (source / name).write_bytes(name.encode() * 1000)
+        local = tmp_path / "local"
+        local.mkdir()
+        items = [{"id": name, "file": {"blob_path": name}} for name in "abc"]
+
+        prefetcher = BlobPrefetcher(
+            lambda item: [item["file"]["blob_path"]],
+            lambda blob_path: source / blob_path,
+            local,
+            workers=2,
+            window=1,
+        )
+        for item in prefetcher(items):
+            if item["id"] == "b":
+                # the importer skips b
+                continue
+            temp_path = prefetcher.pop(item["file"]["blob_path"])
+            with open(temp_path, "rb") as f:
+                assert f.read() == item["id"].encode() * 1000
+            os.remove(temp_path)
+
+        assert prefetcher.hits == 2
+        assert os.listdir(local) == []
+        assert prefetcher.pop("d") is None
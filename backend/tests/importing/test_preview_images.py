@@ -0,0 +1,77 @@
+from collective.eximportimport.examples.importing.preview_images import (
+    PreviewImageBatches,
+)
+from collective.eximportimport.examples.importing.preview_images import (
+    PreviewImageStore,
+)
+
+
+class TestPreviewImageStore:
+    def test_add_and_items(self, tmp_path):
+        """Images and paths are streamed in the order they were added."""
+        store = PreviewImageStore(str(tmp_path / "preview.sqlite"), batch_size=2)
+        assert len(store) == 0
+        assert list(store.items()) == []
+        for i in range(3):
+            store.add(f"http://localhost/Plone/doc-{i}", {"filename": f"{i}.png"})
+        store.set_path("http://localhost/Plone/doc-1", "/Plone/doc-1")
+        store.set_path("http://localhost/Plone/other", "/Plone/other")
+        assert len(store) == 3
+        assert list(store.items()) == [
+            ("http://localhost/Plone/doc-0", {"filename": "0.png"}, None),
+            ("http://localhost/Plone/doc-1", {"filename": "1.png"}, "/Plone/doc-1"),
+            ("http://localhost/Plone/doc-2", {"filename": "2.png"}, None),
+        ]
+
+    def test_add_again(self, tmp_path):
+        """Adding the image of a url again keeps its path and its position."""
+        store = PreviewImageStore(str(tmp_path / "preview.sqlite"))
+        store.add("http://localhost/Plone/doc", {"filename": "old.png"})
+        store.add("http://localhost/Plone/other", {"filename": "other.png"})
+        store.set_path("http://localhost/Plone/doc", "/Plone/doc")
+        store.add("http://localhost/Plone/doc", {"filename": "new.png"})
+        assert list(store.items()) == [
+            ("http://localhost/Plone/doc", {"filename": "new.png"}, "/Plone/doc"),
+            ("http://localhost/Plone/other", {"filename": "other.png"}, None),
+        ]
+
+    def test_survives_restart(self, tmp_path):
+        """Committed entries are read by a new store, remove deletes the file."""
+        filepath = str(tmp_path / "preview.sqlite")
+        store = PreviewImageStore(filepath)
+        store.add("http://localhost/Plone/doc", {"filename": "doc.png"})
+        store.commit()
+        restarted = PreviewImageStore(filepath)
+        assert len(restarted) == 1
+        restarted.remove()
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestPreviewImageBatches:
+    def test_commit_by_count(self):
+        """A commit is due every max_items images, savepoints in between."""
+        batches = PreviewImageBatches(max_items=4, savepoint_items=2)
+        assert [batches.add(10) for _i in range(8)] == [
+            None,
+            "savepoint",
+            None,
+            "commit",
+            None,
+            "savepoint",
+            None,
+            "commit",
+        ]
+        assert batches.commits == 2
+
+    def test_commit_by_size(self):
+        """Large images are committed before max_items is reached."""
+        batches = PreviewImageBatches(max_items=100, max_bytes=1000)
+        assert [batches.add(400) for _i in range(4)] == [None, None, "commit", None]
+        assert batches.bytes == 400
+
+    def test_without_commit(self):
+        """Without commits a savepoint is taken every savepoint_items images."""
+        batches = PreviewImageBatches(commit=False, max_items=2, savepoint_items=3)
+        due = [batches.add(10**9) for _i in range(6)]
+        assert due == [None, None, "savepoint", None, None, "savepoint"]
+        assert batches.commits == 0
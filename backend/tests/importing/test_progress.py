@@ -0,0 +1,39 @@
+from collective.eximportimport.examples.importing.progress import ImportProgress
+
+
+UIDS = [f"{i:032x}" for i in range(4)]
+
+
+class TestImportProgress:
+    def test_resume(self, tmp_path):
+        """Committed UIDs and the first unfinished position survive a restart."""
+        source = tmp_path / "Plone.jsonl"
+        progress = ImportProgress(source)
+        assert progress.load() is None
+        for index in range(len(UIDS)):
+            progress.consumed((0, index))
+        # the second item waits for its parent, the others are imported
+        for index in (0, 2, 3):
+            progress.add(UIDS[index])
+            progress.done((0, index))
+        progress.commit()
+        # not committed
+        progress.add("not-committed")
+
+        restarted = ImportProgress(source)
+        assert restarted.load() == (0, 1)
+        assert UIDS[0] in restarted
+        assert UIDS[1] not in restarted
+        assert "not-committed" not in restarted
+        assert len(restarted) == 3
+
+        restarted.clear()
+        assert list(tmp_path.iterdir()) == []
+
+    def test_position_without_outstanding_items(self, tmp_path):
+        """Without waiting items the last read position is stored."""
+        progress = ImportProgress(tmp_path / "export")
+        progress.consumed((1, 20))
+        progress.done((1, 20))
+        assert progress.position() == (1, 20)
+        assert None not in progress
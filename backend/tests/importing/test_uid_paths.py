@@ -0,0 +1,40 @@
+from collective.eximportimport.examples.importing.uid_paths import UIDPathResolver
+
+
+class TestUIDPathResolver:
+    def test_added_paths(self):
+        """Added paths are returned without a lookup."""
+        lookups = []
+        resolver = UIDPathResolver(lookup=lookups.append)
+        resolver.add("uid-1", "/Plone/folder")
+        assert resolver("uid-1") == "/Plone/folder"
+        assert lookups == []
+        assert (resolver.hits, resolver.misses) == (1, 0)
+
+    def test_lookup_misses(self):
+        """Misses are looked up, found paths are cached."""
+        paths = {"uid-1": "/Plone/folder"}
+        lookups = []
+
+        def lookup(uid):
+            lookups.append(uid)
+            return paths.get(uid)
+
+        resolver = UIDPathResolver(lookup=lookup)
+        assert resolver("uid-1") == "/Plone/folder"
+        assert resolver("uid-1") == "/Plone/folder"
+        assert resolver("uid-2") is None
+        assert resolver("uid-2") is None
+        assert lookups == ["uid-1", "uid-2", "uid-2"]
+        assert (resolver.hits, resolver.misses) == (1, 3)
+
+    def test_bounded(self):
+        """The least recently used paths are dropped."""
+        resolver = UIDPathResolver(maxsize=2)
+        resolver.add("uid-1", "/Plone/1")
+        resolver.add("uid-2", "/Plone/2")
+        assert resolver("uid-1") == "/Plone/1"
+        resolver.add("uid-3", "/Plone/3")
+        assert len(resolver) == 2
+        assert resolver("uid-2") is None
+        assert resolver("uid-1") == "/Plone/1"
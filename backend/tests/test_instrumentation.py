@@ -0,0 +1,59 @@
+from collective.eximportimport.examples.instrumentation import PeakRSS
+from collective.eximportimport.examples.instrumentation import RunReport
+from pathlib import Path
+
+import json
+import pytest
+import time
+
+
+class TestRunReport:
+    def test_stages(self, tmp_path):
+        """Every stage is recorded with timings, also when it fails."""
+        report = RunReport("export")
+        with report.stage("content") as stage:
+            stage["items"] = 10
+        report.skip("export_members")
+        with pytest.raises(ValueError), report.stage("export_relations"):
+            raise ValueError("broken")
+
+        data = json.loads(Path(report.write(tmp_path)).read_text())
+        assert [stage["name"] for stage in data["stages"]] == [
+            "content",
+            "export_members",
+            "export_relations",
+        ]
+        content, members, relations = data["stages"]
+        assert content["status"] == "ok"
+        assert content["items"] == 10
+        assert content["items_per_second"] > 0
+        assert content["rss_end_mb"] > 0
+        assert content["rss_delta_mb"] == round(
+            content["rss_end_mb"] - content["rss_start_mb"], 1
+        )
+        assert data["process_peak_rss_mb"] > 0
+        assert members["status"] == "skipped"
+        assert relations["status"] == "failed"
+
+    def test_stage_peak(self):
+        """Memory freed before the end of a stage still shows in its peak."""
+        report = RunReport("import")
+        with report.stage("content"):
+            data = b"x" * 100 * 1024 * 1024
+            time.sleep(0.3)
+            del data
+        (stage,) = report.stages
+        assert stage["peak_rss_mb"] >= stage["rss_start_mb"] + 90
+        assert stage["peak_rss_mb"] >= stage["rss_end_mb"] + 90
+
+
+class TestPeakRSS:
+    def test_peak(self):
+        """The peak is the maximum of the samples, also after stopping."""
+        peak_rss = PeakRSS(interval=0.01).start()
+        start = peak_rss.peak
+        data = b"x" * 50 * 1024 * 1024
+        time.sleep(0.1)
+        del data
+        assert peak_rss.stop() >= start + 45
+        assert not peak_rss._thread.is_alive()
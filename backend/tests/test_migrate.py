@@ -0,0 +1,104 @@
+from collective.eximportimport.examples.exporting import export_all
+from collective.eximportimport.examples.importing import fix_all
+from collective.eximportimport.examples.importing import import_all
+from collective.eximportimport.examples.importing import import_content
+from importlib.util import module_from_spec
+from importlib.util import spec_from_file_location
+from pathlib import Path
+
+import pytest
+
+
+SCRIPT = Path(__file__).parents[1] / "scripts" / "migrate.py"
+
+
+@pytest.fixture
+def migrate(monkeypatch):
+    """The migrate.py script as module, the settings it changes are restored."""
+    spec = spec_from_file_location("migrate", SCRIPT)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+    settings = [*module.SETTINGS.values()]
+    settings += [
+        (import_all, "DEFERRED_INDEXING"),
+        (import_all, "LINKINTEGRITY_ONLY_WITH_LINKS"),
+    ]
+    for settings_module, setting in settings:
+        monkeypatch.setattr(settings_module, setting, getattr(settings_module, setting))
+    return module
+
+
+class TestMigrate:
+    def test_parse_args(self, migrate, tmp_path):
+        """Stages and flags are parsed, unset flags are None."""
+        import_dir = str(tmp_path)
+        args = migrate.parse_args([
+            "import",
+            "fix",
+            "--import-dir",
+            import_dir,
+            "--skip",
+            "content",
+        ])
+        assert args.stages == ["import", "fix"]
+        assert args.import_dir == import_dir
+        assert args.skip == ["content"]
+        assert args.commit is None
+        assert args.cache_size is None
+
+    def test_skip(self, migrate, tmp_path):
+        """Skipped names apply to all stages or, with a prefix, to one."""
+        args = migrate.parse_args([
+            "export",
+            "import",
+            f"--import-dir={tmp_path}",
+            "--skip=export:content",
+            "--skip=update_link_integrity",
+        ])
+        assert migrate.stage_skip(args.skip, "export") == {
+            "content",
+            "update_link_integrity",
+        }
+        assert migrate.stage_skip(args.skip, "import") == {"update_link_integrity"}
+
+    def test_skip_unknown_stage(self, migrate):
+        """A prefix that is no stage is an error."""
+        with pytest.raises(SystemExit):
+            migrate.parse_args(["import", "--skip=imprt:content"])
+
+    def test_configure(self, migrate, tmp_path):
+        """The flags override the settings of the stages."""
+        args = migrate.parse_args([
+            "export",
+            "import",
+            "fix",
+            f"--import-dir={tmp_path}",
+            "--chunk-size=100",
+            "--shards=4",
+            "--parallel-exports=2",
+            "--commit=1000",
+            "--commit-max-seconds=60",
+            "--indexing-batch-size=200",
+            "--linkintegrity-batch-size=300",
+            "--reset-dates-batch-size=400",
+            "--no-deferred-indexing",
+            "--all-links",
+        ])
+        migrate.configure(args)
+        assert export_all.CHUNK_SIZE == 100
+        assert export_all.SHARDS == 4
+        assert export_all.PARALLEL_EXPORTS == 2
+        assert import_all.CONTENT_COMMIT == 1000
+        assert import_content.COMMIT_MAX_SECONDS == 60
+        assert import_all.INDEXING_BATCH_SIZE == 200
+        assert import_all.LINKINTEGRITY_BATCH_SIZE == 300
+        assert fix_all.RESET_DATES_BATCH_SIZE == 400
+        assert import_all.DEFERRED_INDEXING is False
+        assert import_all.LINKINTEGRITY_ONLY_WITH_LINKS is False
+
+    def test_defaults_kept(self, migrate, tmp_path):
+        """Settings without a flag keep their value."""
+        commit = import_all.CONTENT_COMMIT
+        migrate.configure(migrate.parse_args(["import", f"--import-dir={tmp_path}"]))
+        assert commit == import_all.CONTENT_COMMIT
+        assert import_all.DEFERRED_INDEXING is True